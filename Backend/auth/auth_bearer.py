@@ -1,10 +1,42 @@
 from fastapi import Request, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from .auth_handler import validar_token
+from .auth_handler import USO_STREAM, validar_token
+from .token_cache import cache_tokens
+from core.metricas import medir
 
 class JWTBearer(HTTPBearer):
     async def __call__(self, request: Request):
         credentials: HTTPAuthorizationCredentials = await super().__call__(request)
-        token = credentials.credentials
-        payload = validar_token(token)
-        return payload
\ No newline at end of file
+        return self.validar(credentials.credentials)
+
+    @staticmethod
+    def validar(token: str) -> dict:
+        if cache_tokens.esta_revocado(token):
+            raise HTTPException(status_code=401, detail="Token revocado")
+
+        payload = cache_tokens.obtener(token)
+        if payload is None:
+            with medir("jwt_decode"):
+                payload = validar_token(token)
+            # Un ticket de stream pasa por logs de acceso (va en la URL): no vale como token
+            if payload.get("uso") == USO_STREAM:
+                raise HTTPException(status_code=401, detail="Token inválido o mal formado")
+            cache_tokens.guardar(token, payload)
+        return payload
+
+class JWTBearerSSE(JWTBearer):
+    """Como JWTBearer, pero acepta `?ticket=`: EventSource no permite mandar headers.
+
+    El ticket se pide a POST /auth/stream-ticket y vence a los SSE_TICKET_TTL segundos, así
+    que el token de sesión nunca queda en la URL. Solo se valida al conectar: para reconectar
+    después de que venció hay que pedir otro y pasar `since`/`cursor` del último evento.
+    """
+
+    async def __call__(self, request: Request):
+        ticket = request.query_params.get("ticket")
+        if ticket is None:
+            return await super().__call__(request)
+        payload = validar_token(ticket)
+        if payload.get("uso") != USO_STREAM:
+            raise HTTPException(status_code=401, detail="Ticket de stream inválido")
+        return payload
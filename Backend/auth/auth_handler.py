@@ -8,6 +8,15 @@ def crear_token(data: dict) -> str:
     data_copy["exp"] = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     return encode(data_copy, settings.secret_key, algorithm=settings.algorithm)
 
+# Propósito de los tickets de stream: solo sirven para abrir /<recurso>/changes/stream
+USO_STREAM = "stream"
+
+def crear_ticket_stream(payload: dict) -> str:
+    """Ticket de vida corta para EventSource, que solo puede autenticarse por la URL."""
+    ticket = {"email": payload.get("email"), "rol": payload.get("rol"), "uso": USO_STREAM}
+    ticket["exp"] = datetime.utcnow() + timedelta(seconds=settings.sse_ticket_ttl)
+    return encode(ticket, settings.secret_key, algorithm=settings.algorithm)
+
 def validar_token(token: str) -> dict:
     try:
         return decode(token, settings.secret_key, algorithms=[settings.algorithm])
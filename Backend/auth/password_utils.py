@@ -1,9 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
 from passlib.context import CryptContext
+from core.config import settings
+from core.metricas import medir
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+# bcrypt libera el GIL: un pool acotado limita cuántos hashes compiten por CPU a la vez
+# sin importar cuántos requests estén en curso.
+_executor = ThreadPoolExecutor(max_workers=settings.bcrypt_workers, thread_name_prefix="bcrypt")
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    with medir("bcrypt_hash"):
+        return _executor.submit(pwd_context.hash, password).result()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with medir("bcrypt_verify"):
+        return _executor.submit(pwd_context.verify, plain_password, hashed_password).result()
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verifica y, si el hash usa un coste distinto al configurado, devuelve uno nuevo."""
+    with medir("bcrypt_verify"):
+        return _executor.submit(pwd_context.verify_and_update, plain_password, hashed_password).result()
+
+def precalentar():
+    """Carga el backend de bcrypt y levanta los hilos del pool antes del primer login."""
+    for futuro in [_executor.submit(pwd_context.dummy_verify) for _ in range(settings.bcrypt_workers)]:
+        futuro.result()
@@ -0,0 +1,91 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+from core.cache import CacheRedis, cache_catalogo
+from core.config import settings
+
+def _digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class CacheTokens:
+    """LRU con TTL de payloads ya verificados, indexada por el sha256 del token.
+
+    Cada entrada vence en lo que ocurra primero: el TTL de la cache o el `exp` del token.
+    Los tokens revocados quedan en una denylist hasta su `exp`. Con `compartido` (el backend
+    redis de la cache) la denylist también se guarda ahí, y un logout vale en todos los workers.
+    """
+
+    def __init__(self, max_entradas: int, ttl: int, compartido=None):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.compartido = compartido
+        self._entradas = OrderedDict()
+        self._revocados = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, token: str) -> Optional[dict]:
+        if self.max_entradas <= 0:
+            return None
+        clave = _digest(token)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            vence, payload = entrada
+            if vence <= time.time():
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return payload
+
+    def guardar(self, token: str, payload: dict):
+        if self.max_entradas <= 0:
+            return
+        vence = time.time() + self.ttl
+        if "exp" in payload:
+            vence = min(vence, float(payload["exp"]))
+        clave = _digest(token)
+        with self._lock:
+            self._entradas[clave] = (vence, payload)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def revocar(self, token: str, exp: Optional[float] = None):
+        clave = _digest(token)
+        with self._lock:
+            self._entradas.pop(clave, None)
+            ahora = time.time()
+            # La denylist solo necesita recordar tokens que todavía no vencieron
+            self._revocados = {k: v for k, v in self._revocados.items() if v > ahora}
+            vence = exp if exp is not None else ahora + settings.access_token_expire_minutes * 60
+            self._revocados[clave] = vence
+        if self.compartido is not None:
+            self.compartido.set(f"revocado:{clave}", b"1", max(1, math.ceil(vence - ahora)))
+
+    def esta_revocado(self, token: str) -> bool:
+        clave = _digest(token)
+        with self._lock:
+            vence = self._revocados.get(clave)
+        if vence is not None and vence > time.time():
+            return True
+        return self.compartido is not None and self.compartido.get(f"revocado:{clave}") is not None
+
+    def invalidar(self, predicado: Callable[[dict], bool]):
+        """Descarta las entradas cuyo payload cumpla el predicado (p.ej. por email)."""
+        with self._lock:
+            for clave in [k for k, (_, payload) in self._entradas.items() if predicado(payload)]:
+                del self._entradas[clave]
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+cache_tokens = CacheTokens(
+    settings.token_cache_size,
+    settings.token_cache_ttl,
+    cache_catalogo.backend if isinstance(cache_catalogo.backend, CacheRedis) else None,
+)
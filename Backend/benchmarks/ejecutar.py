@@ -0,0 +1,455 @@
+"""Benchmark de la API: siembra una base local, levanta uvicorn y mide cada escenario.
+
+Uso (desde Backend/):
+
+    python -m benchmarks.ejecutar --productos 100000 --ventas 500000 --concurrencia 16
+
+Por defecto usa SQLite en benchmarks/bench.db; con --db-url se apunta a un MySQL local.
+Los resultados quedan en benchmarks/resultados/ y se comparan con la corrida anterior.
+
+Para medir la cache de tokens (auth.verify_token y todos los endpoints protegidos) se corre
+dos veces, con --token-cache-size 0 y con el valor por defecto, y se comparan las corridas.
+
+Al final se verifica que las compras concurrentes no sobrevendan (--compradores): si falla,
+el comando termina con código 1.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+CARPETA = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.dirname(CARPETA)
+RESULTADOS = os.path.join(CARPETA, "resultados")
+
+# Valores para que Settings cargue sin .env; no pisan los que ya estén definidos
+ENTORNO_POR_DEFECTO = {
+    "SECRET_KEY": "benchmark-secret-key-benchmark-secret-key",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+    "DB_USER": "benchmark",
+    "DB_PASSWORD": "benchmark",
+    "DB_HOST": "localhost",
+    "DB_NAME": "benchmark",
+}
+
+def percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[indice]
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def procesos_servidor(pid: int) -> List[int]:
+    """El proceso de uvicorn y sus workers, si los hay; solo en Linux."""
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as hijos:
+            pids += [int(hijo) for hijo in hijos.read().split()]
+    except OSError:
+        pass
+    return pids
+
+def cpu_s(pid: int) -> Optional[float]:
+    """Tiempo de CPU (usuario + sistema) consumido por el servidor; solo en Linux."""
+    total = None
+    for proceso in procesos_servidor(pid):
+        try:
+            with open(f"/proc/{proceso}/stat") as stat:
+                # El nombre del proceso va entre paréntesis y puede tener espacios
+                campos = stat.read().rsplit(")", 1)[1].split()
+            total = (total or 0) + (int(campos[11]) + int(campos[12])) / os.sysconf("SC_CLK_TCK")
+        except (OSError, ValueError, IndexError):
+            pass
+    return total
+
+def rss_pico_kb(pid: int) -> Optional[int]:
+    """Pico de memoria residente (VmHWM), sumando los workers si hay varios; solo en Linux."""
+    total = None
+    for proceso in procesos_servidor(pid):
+        try:
+            with open(f"/proc/{proceso}/status") as status:
+                for linea in status:
+                    if linea.startswith("VmHWM:"):
+                        total = (total or 0) + int(linea.split()[1])
+        except OSError:
+            pass
+    return total
+
+class Cliente:
+    """Conexión keep-alive por hilo, como haría un cliente HTTP real."""
+
+    def __init__(self, puerto: int, token: Optional[str], codificacion: str = "identity"):
+        self.puerto = puerto
+        self.token = token
+        self.codificacion = codificacion
+        self.conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=60)
+
+    def pedir(self, metodo: str, ruta: str, cuerpo=None, autenticado: bool = True):
+        headers = {"Accept-Encoding": self.codificacion}
+        if autenticado and self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        datos = None
+        if cuerpo is not None:
+            datos = json.dumps(cuerpo).encode()
+            headers["Content-Type"] = "application/json"
+        try:
+            self.conexion.request(metodo, ruta, body=datos, headers=headers)
+            respuesta = self.conexion.getresponse()
+            contenido = respuesta.read()
+        except (OSError, http.client.HTTPException):
+            # Reconectar y reintentar una vez (p.ej. el servidor cerró la conexión ociosa)
+            self.conexion.close()
+            self.conexion = http.client.HTTPConnection("127.0.0.1", self.puerto, timeout=60)
+            self.conexion.request(metodo, ruta, body=datos, headers=headers)
+            respuesta = self.conexion.getresponse()
+            contenido = respuesta.read()
+        return respuesta.status, contenido
+
+def leer_metricas(puerto: int) -> Dict[str, float]:
+    """Totales de consultas SQL emitidas por requests, leídos de /metrics."""
+    status, contenido = Cliente(puerto, None).pedir("GET", "/metrics", autenticado=False)
+    if status != 200:
+        return {}
+    totales = {"consultas": 0.0, "requests": 0.0}
+    for linea in contenido.decode().splitlines():
+        if linea.startswith("http_request_db_queries_sum{") and 'route="/metrics"' not in linea:
+            totales["consultas"] += float(linea.rsplit(" ", 1)[1])
+        elif linea.startswith("http_request_db_queries_count{") and 'route="/metrics"' not in linea:
+            totales["requests"] += float(linea.rsplit(" ", 1)[1])
+    return totales
+
+def correr_escenario(
+    escenario, puerto: int, token: str, datos: dict, requests: int, concurrencia: int,
+    codificacion: str, pid: int,
+) -> dict:
+    total = max(1, int(requests * escenario.factor))
+    latencias: List[float] = []
+    bytes_recibidos = [0]
+    estados: Dict[int, int] = {}
+    lock = threading.Lock()
+    pendientes = iter(range(total))
+
+    def trabajador(numero: int):
+        azar = random.Random(numero)
+        cliente = Cliente(puerto, token, codificacion)
+        while True:
+            with lock:
+                if next(pendientes, None) is None:
+                    return
+            ruta, cuerpo = escenario.armar(azar, datos)
+            inicio = time.perf_counter()
+            status, contenido = cliente.pedir(escenario.metodo, ruta, cuerpo, escenario.autenticado)
+            duracion = time.perf_counter() - inicio
+            with lock:
+                latencias.append(duracion)
+                # http.client no descomprime: es el cuerpo tal como viajó
+                bytes_recibidos[0] += len(contenido)
+                estados[status] = estados.get(status, 0) + 1
+
+    antes = leer_metricas(puerto)
+    cpu_antes = cpu_s(pid)
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        list(pool.map(trabajador, range(concurrencia)))
+    transcurrido = time.perf_counter() - inicio
+    cpu_despues = cpu_s(pid)
+    despues = leer_metricas(puerto)
+
+    consultas = None
+    if antes and despues and despues["requests"] > antes["requests"]:
+        consultas = (despues["consultas"] - antes["consultas"]) / (despues["requests"] - antes["requests"])
+
+    return {
+        "requests": len(latencias),
+        "throughput_rps": round(len(latencias) / transcurrido, 2),
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+        "consultas_por_request": round(consultas, 2) if consultas is not None else None,
+        "bytes_por_request": round(bytes_recibidos[0] / max(1, len(latencias))),
+        "cpu_ms_por_request": (
+            round((cpu_despues - cpu_antes) * 1000 / max(1, len(latencias)), 3)
+            if cpu_antes is not None and cpu_despues is not None else None
+        ),
+        "estados": {str(k): v for k, v in sorted(estados.items())},
+    }
+
+def verificar_sobreventa(puerto: int, token: str, compradores: int, codificacion: str) -> dict:
+    """Compradores concurrentes de 1 unidad contra un producto con menos stock que compradores.
+
+    Tiene que venderse exactamente el stock inicial (201) y el resto recibir 409: ni stock
+    negativo ni ventas de más. El stock se fija y se lee directo de la base, sin caches.
+    """
+    from sqlalchemy import select, update
+    from db.database import SessionLocal
+    from models.producto import Producto
+
+    stock_inicial = max(1, compradores // 5)
+    db = SessionLocal()
+    try:
+        id_producto = db.execute(
+            select(Producto.id).where(Producto.is_active.is_(True)).order_by(Producto.id).limit(1)
+        ).scalar_one()
+        db.execute(update(Producto).where(Producto.id == id_producto).values(stock=stock_inicial))
+        db.commit()
+    finally:
+        db.close()
+
+    estados: Dict[int, int] = {}
+    lock = threading.Lock()
+    # Todos los hilos piden a la vez, con la conexión ya abierta
+    barrera = threading.Barrier(compradores)
+
+    def comprar(numero: int):
+        cliente = Cliente(puerto, token, codificacion)
+        cliente.conexion.connect()
+        barrera.wait()
+        status, _ = cliente.pedir("POST", "/ventas", {"idUsuario": 1, "idProducto": id_producto, "cantidad": 1})
+        with lock:
+            estados[status] = estados.get(status, 0) + 1
+
+    with ThreadPoolExecutor(max_workers=compradores) as pool:
+        list(pool.map(comprar, range(compradores)))
+
+    db = SessionLocal()
+    try:
+        stock_final = db.execute(select(Producto.stock).where(Producto.id == id_producto)).scalar_one()
+    finally:
+        db.close()
+    vendidos = estados.get(201, 0)
+    return {
+        "compradores": compradores,
+        "stock_inicial": stock_inicial,
+        "stock_final": stock_final,
+        "estados": {str(k): v for k, v in sorted(estados.items())},
+        "ok": stock_final >= 0 and vendidos == stock_inicial and stock_final == stock_inicial - vendidos,
+    }
+
+class Inundacion:
+    """Hilos que mandan logins con passwords incorrectas mientras corren los escenarios.
+
+    Usan emails existentes: con uno inexistente el login responde 401 sin llegar a bcrypt.
+    """
+
+    def __init__(self, puerto: int, hilos: int, codificacion: str, usuarios: int):
+        self.puerto = puerto
+        self.usuarios = usuarios
+        self.hilos = hilos
+        self.codificacion = codificacion
+        self.detener = threading.Event()
+        self.estados: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._hilos: List[threading.Thread] = []
+
+    def _atacar(self, numero: int):
+        cliente = Cliente(self.puerto, None, self.codificacion)
+        azar = random.Random(numero)
+        while not self.detener.is_set():
+            cuerpo = {"email": f"usuario{azar.randint(1, self.usuarios - 1)}@benchmark.com", "password": "Incorrecta1"}
+            status, _ = cliente.pedir("POST", "/auth/login", cuerpo, autenticado=False)
+            with self._lock:
+                self.estados[status] = self.estados.get(status, 0) + 1
+
+    def __enter__(self):
+        for numero in range(self.hilos):
+            hilo = threading.Thread(target=self._atacar, args=(numero,), daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+        return self
+
+    def __exit__(self, *exc):
+        self.detener.set()
+        for hilo in self._hilos:
+            hilo.join(timeout=60)
+
+    def resumen(self) -> dict:
+        return {"hilos": self.hilos, "estados": {str(k): v for k, v in sorted(self.estados.items())}}
+
+def esperar_servidor(puerto: int, proceso: subprocess.Popen, espera: float = 60) -> float:
+    """Espera a que /sistema/ready responda 200; devuelve los segundos desde el lanzamiento."""
+    inicio = time.monotonic()
+    while time.monotonic() < inicio + espera:
+        if proceso.poll() is not None:
+            raise RuntimeError("uvicorn terminó antes de estar listo")
+        try:
+            socket.create_connection(("127.0.0.1", puerto), timeout=1).close()
+            status, _ = Cliente(puerto, None).pedir("GET", "/sistema/ready", autenticado=False)
+            if status == 200:
+                return time.monotonic() - inicio
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"uvicorn no estuvo listo en {espera}s")
+
+def ultima_corrida() -> Optional[dict]:
+    if not os.path.isdir(RESULTADOS):
+        return None
+    archivos = sorted(f for f in os.listdir(RESULTADOS) if f.endswith(".json"))
+    if not archivos:
+        return None
+    with open(os.path.join(RESULTADOS, archivos[-1])) as archivo:
+        return json.load(archivo)
+
+def imprimir(resultado: dict, anterior: Optional[dict]):
+    previos = (anterior or {}).get("escenarios", {})
+    print(
+        f"\n{'escenario':24} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL/req':>8} "
+        f"{'bytes/req':>10} {'CPU ms':>8}  Δp95 vs anterior"
+    )
+    for nombre, datos in resultado["escenarios"].items():
+        delta = ""
+        previo = previos.get(nombre)
+        if previo and previo["p95_ms"]:
+            delta = f"{(datos['p95_ms'] - previo['p95_ms']) / previo['p95_ms'] * 100:+.1f}%"
+        consultas = "-" if datos["consultas_por_request"] is None else datos["consultas_por_request"]
+        cpu = "-" if datos.get("cpu_ms_por_request") is None else datos["cpu_ms_por_request"]
+        print(
+            f"{nombre:24} {datos['throughput_rps']:>9} {datos['p50_ms']:>8} {datos['p95_ms']:>8} "
+            f"{datos['p99_ms']:>8} {consultas:>8} {datos.get('bytes_por_request', '-'):>10} {cpu:>8}  {delta}"
+        )
+    print(f"\nArranque hasta /sistema/ready: {resultado['arranque_s']}s con {resultado['workers']} worker(s)")
+    print(f"RSS pico del servidor: {resultado['rss_pico_kb']} KB")
+    print(f"Cache de tokens: {resultado.get('token_cache_size')} entradas")
+    if "inundacion_login" in resultado:
+        print(f"Inundación de logins: {resultado['inundacion_login']}")
+    if "sobreventa" in resultado:
+        sobreventa = resultado["sobreventa"]
+        print(
+            f"Sobreventa ({'OK' if sobreventa['ok'] else 'FALLA'}): {sobreventa['compradores']} compradores, "
+            f"stock {sobreventa['stock_inicial']} -> {sobreventa['stock_final']}, estados {sobreventa['estados']}"
+        )
+    if anterior:
+        print(f"Comparado con {anterior.get('commit')} ({anterior.get('fecha')})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default=f"sqlite:///{os.path.join(CARPETA, 'bench.db')}")
+    parser.add_argument("--usuarios", type=int, default=1000)
+    parser.add_argument("--categorias", type=int, default=20)
+    parser.add_argument("--productos", type=int, default=10000)
+    parser.add_argument("--ventas", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=500, help="requests por escenario")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="procesos uvicorn (escalado por núcleo); con más de uno, SQL/req sale del worker que atienda /metrics")
+    parser.add_argument(
+        "--encoding", default="identity",
+        help="Accept-Encoding de los clientes (identity, gzip, br) para medir bytes y CPU de la compresión",
+    )
+    parser.add_argument(
+        "--inundar-login", type=int, default=0, metavar="HILOS",
+        help="mandar logins fallidos en paralelo durante toda la corrida, con el rate limit activo",
+    )
+    parser.add_argument(
+        "--compradores", type=int, default=50,
+        help="compras concurrentes contra un producto con stock compradores/5 al terminar (0 no verifica)",
+    )
+    parser.add_argument(
+        "--token-cache-size", type=int, metavar="ENTRADAS",
+        help="TOKEN_CACHE_SIZE del servidor (0 desactiva la cache de tokens verificados)",
+    )
+    parser.add_argument("--escenarios", help="expresión regular para filtrar escenarios por nombre")
+    parser.add_argument("--sin-sembrar", action="store_true", help="reusar la base de la corrida anterior")
+    parser.add_argument("--no-guardar", action="store_true")
+    args = parser.parse_args(argv)
+
+    entorno = {**ENTORNO_POR_DEFECTO, **os.environ, "DB_URL": args.db_url, "METRICS_ENABLED": "true"}
+    # Todos los clientes salen de 127.0.0.1: sin inundación el rate limit solo falsearía auth.login
+    entorno.setdefault("RATE_LIMIT_ENABLED", "true" if args.inundar_login else "false")
+    if args.token_cache_size is not None:
+        entorno["TOKEN_CACHE_SIZE"] = str(args.token_cache_size)
+    os.environ.update(entorno)
+    sys.path.insert(0, BACKEND)
+    os.chdir(BACKEND)
+
+    from benchmarks.sembrar import sembrar, PALABRAS
+    from core.config import settings
+    from benchmarks.escenarios import ESCENARIOS
+
+    volumenes = {k: getattr(args, k) for k in ("usuarios", "categorias", "productos", "ventas")}
+    if args.sin_sembrar:
+        datos = {**volumenes, "categorias": [f"categoria-{i}" for i in range(args.categorias)], "palabras": PALABRAS}
+    else:
+        inicio = time.perf_counter()
+        datos = sembrar(**volumenes)
+        print(f"Base sembrada en {time.perf_counter() - inicio:.1f}s: {volumenes}")
+
+    escenarios = [e for e in ESCENARIOS if not args.escenarios or re.search(args.escenarios, e.nombre)]
+    servidor = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.puerto), "--log-level", "warning",
+         "--workers", str(args.workers)],
+        cwd=BACKEND, env=entorno,
+    )
+    try:
+        arranque = esperar_servidor(args.puerto, servidor)
+        from benchmarks.sembrar import EMAIL_ADMIN, PASSWORD
+        status, contenido = Cliente(args.puerto, None).pedir(
+            "POST", "/auth/login", {"email": EMAIL_ADMIN, "password": PASSWORD}, autenticado=False
+        )
+        if status != 200:
+            raise RuntimeError(f"No se pudo loguear el administrador: {status} {contenido[:200]!r}")
+        token = json.loads(contenido)["token"]
+
+        resultado = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "db": args.db_url.split(":", 1)[0],
+            "volumenes": volumenes,
+            "requests": args.requests,
+            "concurrencia": args.concurrencia,
+            "workers": args.workers,
+            "encoding": args.encoding,
+            "inundar_login": args.inundar_login,
+            "token_cache_size": settings.token_cache_size,
+            "arranque_s": round(arranque, 3),
+            "escenarios": {},
+        }
+        with Inundacion(args.puerto, args.inundar_login, args.encoding, args.usuarios) as inundacion:
+            for escenario in escenarios:
+                print(f"→ {escenario.nombre}", flush=True)
+                resultado["escenarios"][escenario.nombre] = correr_escenario(
+                    escenario, args.puerto, token, datos, args.requests, args.concurrencia,
+                    args.encoding, servidor.pid,
+                )
+        if args.inundar_login:
+            resultado["inundacion_login"] = inundacion.resumen()
+        if args.compradores:
+            print("→ verificación de sobreventa", flush=True)
+            resultado["sobreventa"] = verificar_sobreventa(args.puerto, token, args.compradores, args.encoding)
+        resultado["rss_pico_kb"] = rss_pico_kb(servidor.pid)
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=30)
+
+    anterior = ultima_corrida()
+    imprimir(resultado, anterior)
+    if not args.no_guardar:
+        os.makedirs(RESULTADOS, exist_ok=True)
+        nombre = f"{resultado['fecha'].replace(':', '')}-{resultado['commit'] or 'sin-git'}.json"
+        with open(os.path.join(RESULTADOS, nombre), "w") as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        print(f"Resultados guardados en benchmarks/resultados/{nombre}")
+    if not resultado.get("sobreventa", {"ok": True})["ok"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
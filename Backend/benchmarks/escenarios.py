@@ -0,0 +1,48 @@
+"""Requests que se miden, al menos uno por router de `routes/`."""
+import random
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from benchmarks.sembrar import EMAIL_ADMIN, PASSWORD
+
+@dataclass
+class Escenario:
+    nombre: str
+    metodo: str
+    # Recibe el azar del hilo y los datos sembrados; devuelve (ruta, cuerpo JSON o None)
+    armar: Callable[[random.Random, dict], tuple]
+    autenticado: bool = True
+    # Los escenarios caros (bcrypt, exportación completa) corren menos requests
+    factor: float = 1.0
+
+def _fijo(ruta: str, cuerpo: Optional[dict] = None):
+    return lambda azar, datos: (ruta, cuerpo)
+
+ESCENARIOS = [
+    Escenario("auth.login", "POST", _fijo("/auth/login", {"email": EMAIL_ADMIN, "password": PASSWORD}), autenticado=False, factor=0.25),
+    Escenario("auth.verify_token", "GET", _fijo("/auth/verify-token")),
+    Escenario("usuarios.listar", "GET", _fijo("/usuarios?limite=50")),
+    Escenario("usuarios.filtrar", "GET", lambda azar, datos: (
+        f"/usuarios?limite=50&rol=Cliente&cursor={azar.randint(1, datos['usuarios'])}", None)),
+    Escenario("productos.listar", "GET", _fijo("/productos?limite=50")),
+    Escenario("productos.filtrar", "GET", lambda azar, datos: (
+        f"/productos?limite=50&categoria_producto={azar.choice(datos['categorias'])}&precio_max=500", None)),
+    Escenario("productos.buscar", "GET", lambda azar, datos: (
+        f"/productos/search?q={azar.choice(datos['palabras'])}&limite=20", None)),
+    Escenario("productos.por_id", "GET", lambda azar, datos: (f"/productos/{azar.randint(1, datos['productos'])}", None)),
+    Escenario("productos.lote", "GET", lambda azar, datos: (
+        "/productos/batch?ids=" + ",".join(str(azar.randint(1, datos["productos"])) for _ in range(20)), None)),
+    Escenario("productos.exportar", "GET", _fijo("/productos/exportar?formato=ndjson"), factor=0.1),
+    Escenario("categorias.listar", "GET", _fijo("/categorias")),
+    Escenario("ventas.listar", "GET", _fijo("/ventas?limite=50")),
+    Escenario("ventas.crear", "POST", lambda azar, datos: ("/ventas", {
+        "idUsuario": azar.randint(1, datos["usuarios"]),
+        "idProducto": azar.randint(1, datos["productos"]),
+        "cantidad": 1,
+    })),
+    Escenario("analitica.diarios", "GET", _fijo("/analitica/ingresos/diarios")),
+    Escenario("analitica.productos", "GET", _fijo("/analitica/ingresos/productos?limite=10")),
+    Escenario("analitica.categorias", "GET", _fijo("/analitica/ingresos/categorias")),
+    Escenario("sistema.pool", "GET", _fijo("/sistema/pool")),
+    Escenario("imagenes.original", "GET", _fijo("/imagenes/productos/auris.png"), autenticado=False),
+]
@@ -0,0 +1,93 @@
+"""Carga una base local con volúmenes configurables de datos para los benchmarks."""
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+
+from core.formatos import en_lotes
+from db.database import Base, engine, SessionLocal
+from db.resumenes import recalcular_resumenes
+from auth.password_utils import hash_password
+from models.usuario import Usuario, RolUser
+from models.categoria import Categoria
+from models.producto import Producto
+from models.venta import Venta, EstadoDespacho
+import models.resumen_venta  # noqa: F401  (registra las tablas de rollups)
+import models.eliminacion  # noqa: F401
+
+EMAIL_ADMIN = "admin@benchmark.com"
+PASSWORD = "Benchmark123"
+DIAS_VENTAS = 90
+LOTE = 5000
+
+PALABRAS = [
+    "auriculares", "teclado", "mouse", "monitor", "parlante", "cargador", "cable", "notebook",
+    "tablet", "celular", "camara", "microfono", "impresora", "router", "disco", "memoria",
+]
+PAISES = ["Argentina", "Chile", "Uruguay", "Paraguay", "Bolivia"]
+
+def _insertar(db, modelo, filas):
+    for lote in en_lotes(filas, LOTE):
+        db.execute(insert(modelo), lote)
+    db.commit()
+
+def sembrar(usuarios: int, categorias: int, productos: int, ventas: int, semilla: int = 1234) -> dict:
+    """Recrea el esquema y lo llena; devuelve los ids que necesitan los escenarios."""
+    azar = random.Random(semilla)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    # Un solo hash para todos: sembrar no debería tardar lo que tarda bcrypt por usuario
+    password = hash_password(PASSWORD)
+    nombres_categoria = [f"categoria-{i}" for i in range(categorias)]
+
+    db = SessionLocal()
+    try:
+        _insertar(db, Categoria, [
+            {"nombre": nombre, "descripcion": f"Descripción de {nombre}", "is_active": True}
+            for nombre in nombres_categoria
+        ])
+        _insertar(db, Usuario, (
+            {
+                "nombre": f"Nombre{i}", "apellido": f"Apellido{i}",
+                "email": EMAIL_ADMIN if i == 0 else f"usuario{i}@benchmark.com",
+                "password": password, "pais": azar.choice(PAISES), "ciudad": "Ciudad",
+                "direccion": f"Calle {i}", "telefono": str(1000000 + i),
+                "rol": RolUser.Administrador if i == 0 else RolUser.Cliente,
+                "is_active": True, "imagen": None,
+            }
+            for i in range(usuarios)
+        ))
+        precios = [round(azar.uniform(1, 2000), 2) for _ in range(productos)]
+        categorias_producto = [azar.choice(nombres_categoria) for _ in range(productos)]
+        _insertar(db, Producto, (
+            {
+                "nombre": f"{azar.choice(PALABRAS)} {azar.choice(PALABRAS)} {i}",
+                "descripcion": " ".join(azar.choices(PALABRAS, k=6)),
+                "precio": precios[i], "stock": azar.randint(1000, 100000),
+                "categoria_producto": categorias_producto[i],
+                "is_active": azar.random() > 0.1, "imagen": None,
+            }
+            for i in range(productos)
+        ))
+
+        hasta = datetime.utcnow()
+        desde = hasta - timedelta(days=DIAS_VENTAS)
+        segundos = DIAS_VENTAS * 24 * 3600
+
+        def ventas_generadas():
+            for _ in range(ventas):
+                producto = azar.randint(1, productos)
+                yield {
+                    "idUsuario": azar.randint(1, usuarios), "idProducto": producto,
+                    "cantidad": azar.randint(1, 5), "precio_unitario": precios[producto - 1],
+                    "categoria": categorias_producto[producto - 1],
+                    "fecha": desde + timedelta(seconds=azar.randint(0, segundos)),
+                    "despachado": azar.choice(list(EstadoDespacho)),
+                }
+
+        _insertar(db, Venta, ventas_generadas())
+        recalcular_resumenes(db, desde.date(), hasta.date() + timedelta(days=1))
+    finally:
+        db.close()
+
+    return {"usuarios": usuarios, "categorias": nombres_categoria, "productos": productos, "palabras": PALABRAS}
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Optional
+from fastapi import HTTPException, UploadFile
+from PIL import Image
+from core.config import settings
+from core.imagenes import programar_variantes
+
+TAMAÑO_BLOQUE = 64 * 1024
+
+# Formato detectado por Pillow -> extensión con la que se guarda. `/static` es público:
+# nada que el navegador pueda interpretar como HTML o SVG llega a publicarse.
+EXTENSIONES = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp"}
+
+class ImagenSubida:
+    """Imagen ya copiada a un temporal; recién se publica en su ruta final con `confirmar()`."""
+
+    def __init__(self, temporal: str, ruta: str):
+        self.temporal = temporal
+        self.ruta = ruta
+
+    def confirmar(self) -> str:
+        # Mismo contenido => mismo nombre: si ya existe, el archivo está deduplicado
+        if os.path.exists(self.ruta):
+            os.remove(self.temporal)
+        else:
+            os.replace(self.temporal, self.ruta)
+            programar_variantes(self.ruta)
+        return self.ruta
+
+    def descartar(self):
+        if os.path.exists(self.temporal):
+            os.remove(self.temporal)
+
+@contextmanager
+def descartar_si_falla(subida: Optional[ImagenSubida]):
+    """Borra el temporal si el request falla (validación, 404, error de la base).
+
+    Si falla el commit después de `confirmar()` la imagen ya publicada queda: su nombre es el
+    hash del contenido, así que puede ser de otra fila y un reintento la vuelve a usar.
+    """
+    try:
+        yield
+    except BaseException:
+        if subida:
+            subida.descartar()
+        raise
+
+def detectar_extension(ruta: str) -> str:
+    """Abre el archivo con Pillow y devuelve la extensión de su formato real."""
+    try:
+        with Image.open(ruta) as imagen:
+            formato = imagen.format
+            imagen.verify()
+    except Exception:
+        # Incluye DecompressionBombError: tampoco se aceptan imágenes gigantes
+        formato = None
+    if formato not in EXTENSIONES:
+        raise HTTPException(status_code=400, detail="El archivo debe ser una imagen JPEG, PNG, GIF o WebP")
+    return EXTENSIONES[formato]
+
+def recibir_imagen(imagen: UploadFile, carpeta: str) -> ImagenSubida:
+    """Copia la subida en bloques a un temporal calculando su sha256, con límite de tamaño.
+
+    El tipo no se toma del cliente: la extensión sale del formato que detecta Pillow.
+    """
+    if imagen.content_type and not imagen.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="El archivo debe ser una imagen")
+
+    os.makedirs(carpeta, exist_ok=True)
+    hasher = hashlib.sha256()
+    total = 0
+
+    fd, temporal = tempfile.mkstemp(dir=carpeta, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as destino:
+            while bloque := imagen.file.read(TAMAÑO_BLOQUE):
+                total += len(bloque)
+                if total > settings.max_upload_bytes:
+                    raise HTTPException(status_code=413, detail="La imagen supera el tamaño máximo permitido")
+                hasher.update(bloque)
+                destino.write(bloque)
+        extension = detectar_extension(temporal)
+    except BaseException:
+        os.remove(temporal)
+        raise
+
+    return ImagenSubida(temporal, f"{carpeta}/{hasher.hexdigest()}{extension}")
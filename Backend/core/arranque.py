@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import time
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Se importa primero en main.py: desde acá se mide el arranque en frío de cada worker
+INICIO = time.monotonic()
+
+# Reintentos del precalentamiento si falla al arrancar (segundos, con backoff exponencial)
+ESPERA_INICIAL = 1.0
+ESPERA_MAXIMA = 30.0
+
+class EstadoServidor:
+    """Lo que consulta /sistema/ready: el worker terminó de precalentar y no se está apagando."""
+
+    def __init__(self):
+        self.listo = False
+        self.arranque_s = None
+
+estado_servidor = EstadoServidor()
+
+def estado_local() -> list:
+    """Lo que queda en memoria de cada worker con la configuración actual (vacío si todo es compartido)."""
+    from auth.token_cache import cache_tokens
+    from core.cache import CacheLocal, cache_catalogo
+    from core.limites import LimitadorLocal, limitador
+
+    locales = []
+    if isinstance(cache_catalogo.backend, CacheLocal):
+        locales.append("cache del catálogo y de identidad (CACHE_BACKEND)")
+    if cache_tokens.compartido is None:
+        locales.append("denylist de tokens del logout (CACHE_BACKEND)")
+    if settings.rate_limit_enabled and isinstance(limitador, LimitadorLocal):
+        locales.append("rate limiting (RATE_LIMIT_BACKEND)")
+    return locales
+
+def precalentar() -> dict:
+    """Abre conexiones del pool y carga bcrypt/JWT antes de aceptar tráfico. Devuelve los tiempos."""
+    from auth.auth_handler import crear_token, validar_token
+    from auth.password_utils import precalentar as precalentar_bcrypt
+    from db.database import engine, replica_engine, precalentar_pool
+
+    tiempos = {}
+    inicio = time.perf_counter()
+    precalentar_pool(engine, settings.db_pool_prewarm)
+    if replica_engine is not engine:
+        precalentar_pool(replica_engine, settings.db_pool_prewarm)
+    tiempos["pool_s"] = round(time.perf_counter() - inicio, 3)
+
+    inicio = time.perf_counter()
+    precalentar_bcrypt()
+    validar_token(crear_token({"precalentamiento": True}))
+    tiempos["auth_s"] = round(time.perf_counter() - inicio, 3)
+    return tiempos
+
+async def precalentar_servidor() -> bool:
+    """Un intento de precalentar; si sale bien marca el worker como listo para /sistema/ready."""
+    from anyio import to_thread
+
+    try:
+        tiempos = await to_thread.run_sync(precalentar)
+    except Exception:
+        logger.exception("Falló el precalentamiento; el worker no queda listo")
+        return False
+    estado_servidor.arranque_s = round(time.monotonic() - INICIO, 3)
+    estado_servidor.listo = True
+    logger.info("Worker listo en %ss (%s)", estado_servidor.arranque_s, tiempos)
+    return True
+
+async def reintentar_precalentamiento():
+    """Reintenta en segundo plano hasta lograrlo, p.ej. cuando la base todavía no respondía al arrancar."""
+    espera = ESPERA_INICIAL
+    while True:
+        await asyncio.sleep(espera)
+        if await precalentar_servidor():
+            return
+        espera = min(espera * 2, ESPERA_MAXIMA)
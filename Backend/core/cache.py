@@ -0,0 +1,168 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, List, Optional
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class CacheLocal:
+    """LRU con TTL en memoria del proceso. También sirve de stand-in del backend compartido."""
+
+    def __init__(self, max_entradas: int):
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._contadores = {}
+        self._lock = threading.Lock()
+
+    def get(self, clave: str) -> Optional[bytes]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            vence, valor = entrada
+            if vence <= time.time():
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return valor
+
+    def set(self, clave: str, valor: bytes, ttl: int):
+        with self._lock:
+            self._entradas[clave] = (time.time() + ttl, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def get_contador(self, clave: str) -> int:
+        with self._lock:
+            return self._contadores.get(clave, 0)
+
+    def incr(self, clave: str) -> int:
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + 1
+            return self._contadores[clave]
+
+class CacheRedis:
+    """Adaptador para un cliente tipo redis (get/set con ex/incr), compartido entre workers."""
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    def get(self, clave: str) -> Optional[bytes]:
+        return self.cliente.get(clave)
+
+    def set(self, clave: str, valor: bytes, ttl: int):
+        self.cliente.set(clave, valor, ex=ttl)
+
+    def get_contador(self, clave: str) -> int:
+        return int(self.cliente.get(clave) or 0)
+
+    def incr(self, clave: str) -> int:
+        return self.cliente.incr(clave)
+
+@dataclass
+class EntradaCache:
+    etag: str
+    cursor: Optional[str]
+    cuerpo: bytes
+
+    def a_bytes(self) -> bytes:
+        return f"{self.etag}\n{self.cursor or ''}\n".encode() + self.cuerpo
+
+    @classmethod
+    def desde_bytes(cls, datos: bytes) -> "EntradaCache":
+        etag, cursor, cuerpo = datos.split(b"\n", 2)
+        return cls(etag.decode(), cursor.decode() or None, cuerpo)
+
+class CacheCatalogo:
+    """Read-through por espacio de nombres ("productos", "categorias").
+
+    Invalidar un espacio incrementa su versión: las claves viejas dejan de consultarse
+    y vencen solas por TTL, sin tener que recorrerlas.
+    """
+
+    def __init__(self, backend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+
+    def version(self, espacio: str) -> int:
+        return self.backend.get_contador(f"version:{espacio}")
+
+    def obtener_o_calcular(self, espacio: str, consulta: str, calcular: Callable[[], EntradaCache]) -> EntradaCache:
+        clave = f"{espacio}:{self.version(espacio)}:{consulta}"
+        datos = self.backend.get(clave)
+        if datos is not None:
+            return EntradaCache.desde_bytes(datos)
+
+        entrada = calcular()
+        self.backend.set(clave, entrada.a_bytes(), self.ttl)
+        return entrada
+
+    def invalidar(self, *espacios: str):
+        for espacio in espacios:
+            self.backend.incr(f"version:{espacio}")
+
+class CacheIdentidad:
+    """Filas por clave primaria en memoria del proceso (para los GET por id y por lote).
+
+    Cada entrada guarda la versión del espacio con que se leyó: las mismas invalidaciones
+    de CacheCatalogo la dejan obsoleta, también entre workers si el backend es redis. Con
+    el backend local la versión es de cada worker, así que además vence a los CACHE_TTL
+    segundos, como los listados: un cambio hecho en otro worker se ve a lo sumo con ese atraso.
+    """
+
+    def __init__(self, catalogo: CacheCatalogo, max_entradas: int):
+        self.catalogo = catalogo
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener_muchos(
+        self, espacio: str, claves: List[Hashable], cargar: Callable[[List[Hashable]], Dict[Hashable, dict]]
+    ) -> Dict[Hashable, dict]:
+        """Devuelve {clave: fila} de las que existen; las que no están en cache se cargan juntas."""
+        version = self.catalogo.version(espacio)
+        ahora = time.monotonic()
+        encontradas = {}
+        faltantes = []
+        with self._lock:
+            for clave in claves:
+                entrada = self._entradas.get((espacio, clave))
+                if entrada is not None and entrada[0] == version and entrada[1] > ahora:
+                    self._entradas.move_to_end((espacio, clave))
+                    encontradas[clave] = entrada[2]
+                else:
+                    faltantes.append(clave)
+
+        if faltantes:
+            cargadas = cargar(faltantes)
+            encontradas.update(cargadas)
+            if self.max_entradas > 0:
+                vence = ahora + self.catalogo.ttl
+                with self._lock:
+                    for clave, fila in cargadas.items():
+                        self._entradas[(espacio, clave)] = (version, vence, fila)
+                        self._entradas.move_to_end((espacio, clave))
+                    while len(self._entradas) > self.max_entradas:
+                        self._entradas.popitem(last=False)
+        return encontradas
+
+def calcular_etag(cuerpo: bytes) -> str:
+    return '"' + hashlib.blake2b(cuerpo, digest_size=16).hexdigest() + '"'
+
+def crear_backend():
+    if settings.cache_backend == "redis" and settings.cache_redis_url:
+        try:
+            import redis
+        except ImportError:
+            logger.warning("CACHE_BACKEND=redis pero el paquete redis no está instalado; se usa la cache local")
+        else:
+            return CacheRedis(redis.Redis.from_url(settings.cache_redis_url))
+    return CacheLocal(settings.cache_max_entradas)
+
+cache_catalogo = CacheCatalogo(crear_backend(), settings.cache_ttl)
+cache_identidad = CacheIdentidad(cache_catalogo, settings.identity_cache_size)
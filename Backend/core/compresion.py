@@ -0,0 +1,151 @@
+import logging
+import zlib
+from typing import Optional
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin el paquete se negocia solo gzip
+    brotli = None
+
+# Solo texto: las imágenes y los archivos ya comprimidos no ganan nada y cuestan CPU
+TIPOS_COMPRIMIBLES = ("application/json", "application/x-ndjson", "text/")
+
+def elegir_codificacion(accept_encoding: str) -> Optional[str]:
+    """`br` si el cliente lo acepta y está instalado; si no `gzip`; si no, nada."""
+    aceptadas = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                calidad = float(parametros.strip()[2:])
+            except ValueError:
+                calidad = 0.0
+        aceptadas[nombre.strip()] = calidad
+    if brotli is not None and aceptadas.get("br", 0) > 0:
+        return "br"
+    if aceptadas.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+class _Compresor:
+    """Interfaz común sobre zlib (gzip) y brotli para comprimir por partes."""
+
+    def __init__(self, codificacion: str):
+        if codificacion == "br":
+            self._compresor = brotli.Compressor(quality=settings.compression_brotli_quality)
+            self.comprimir = self._compresor.process
+            self.vaciar = self._compresor.flush
+            self.terminar = self._compresor.finish
+        else:
+            # wbits=31: formato gzip (cabecera + CRC) en lugar de zlib crudo
+            self._compresor = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+            self.comprimir = self._compresor.compress
+            self.vaciar = lambda: self._compresor.flush(zlib.Z_SYNC_FLUSH)
+            self.terminar = self._compresor.flush
+
+class CompresionMiddleware:
+    """Middleware ASGI que comprime respuestas de texto con brotli o gzip según Accept-Encoding.
+
+    Las respuestas de un solo cuerpo se comprimen si superan COMPRESSION_MIN_BYTES; las que
+    llegan en partes (streaming) se comprimen parte por parte, vaciando el compresor en cada
+    una para no retener filas. El ETag pasa a débil: el cuerpo cambia pero el contenido no.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        codificacion = elegir_codificacion(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+        compresor = None
+
+        async def enviar(mensaje):
+            nonlocal inicio, compresor
+            if mensaje["type"] == "http.response.start":
+                # Se retiene hasta ver el primer cuerpo: recién ahí se sabe si conviene comprimir
+                inicio = mensaje
+                return
+            if mensaje["type"] != "http.response.body":
+                # Otros mensajes (p.ej. `http.response.pathsend` de FileResponse, trailers) pasan
+                # sin comprimir, pero antes tiene que salir el inicio retenido
+                if inicio is not None:
+                    await send(inicio)
+                    inicio = None
+                await send(mensaje)
+                return
+
+            if inicio is not None:
+                respuesta = inicio
+                inicio = None
+                cuerpo = mensaje.get("body", b"")
+                sigue = mensaje.get("more_body", False)
+                if not self._conviene(respuesta, cuerpo, sigue):
+                    await send(respuesta)
+                    await send(mensaje)
+                    return
+
+                compresor = _Compresor(codificacion)
+                if sigue:
+                    comprimido = compresor.comprimir(cuerpo) + compresor.vaciar()
+                else:
+                    comprimido = compresor.comprimir(cuerpo) + compresor.terminar()
+                await send(self._encabezados(respuesta, codificacion, None if sigue else len(comprimido)))
+                await send({"type": "http.response.body", "body": comprimido, "more_body": sigue})
+                return
+
+            if compresor is None:
+                await send(mensaje)
+                return
+            cuerpo = compresor.comprimir(mensaje.get("body", b""))
+            if mensaje.get("more_body", False):
+                cuerpo += compresor.vaciar()
+                if cuerpo:
+                    await send({"type": "http.response.body", "body": cuerpo, "more_body": True})
+            else:
+                await send({"type": "http.response.body", "body": cuerpo + compresor.terminar(), "more_body": False})
+
+        await self.app(scope, receive, enviar)
+
+    @staticmethod
+    def _conviene(respuesta: dict, cuerpo: bytes, sigue: bool) -> bool:
+        headers = {k.lower(): v for k, v in respuesta["headers"]}
+        if b"content-encoding" in headers or respuesta["status"] in (204, 206, 304):
+            return False
+        tipo = headers.get(b"content-type", b"").decode("latin-1")
+        # Los eventos SSE tienen que llegar apenas se emiten, sin pasar por un compresor
+        if not tipo.startswith(TIPOS_COMPRIMIBLES) or tipo.startswith("text/event-stream"):
+            return False
+        # En streaming no se conoce el total: se comprime siempre
+        return sigue or len(cuerpo) >= settings.compression_min_bytes
+
+    @staticmethod
+    def _encabezados(respuesta: dict, codificacion: str, largo: Optional[int]) -> dict:
+        headers = []
+        for clave, valor in respuesta["headers"]:
+            nombre = clave.lower()
+            if nombre == b"content-length":
+                continue
+            if nombre == b"etag" and not valor.startswith(b"W/"):
+                valor = b"W/" + valor
+            if nombre == b"vary":
+                continue
+            headers.append((clave, valor))
+        vary = [v for k, v in respuesta["headers"] if k.lower() == b"vary"]
+        headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+        headers.append((b"content-encoding", codificacion.encode()))
+        if largo is not None:
+            headers.append((b"content-length", str(largo).encode()))
+        return {**respuesta, "headers": headers}
@@ -1,21 +1,116 @@
 from pydantic_settings import BaseSettings
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
 
+    # Cache de tokens ya verificados (0 entradas la desactiva)
+    token_cache_size: int = 1024
+    token_cache_ttl: int = 300
+
+    # Coste de bcrypt y cantidad de hilos dedicados a hashear/verificar
+    bcrypt_rounds: int = 12
+    bcrypt_workers: int = 4
+
     db_user: str
     db_password: str
     db_host: str
     db_port: str = "3306"
     db_name: str
+    # URL completa de SQLAlchemy; si se define reemplaza a la de MySQL (p.ej. sqlite para benchmarks)
+    db_url: Optional[str] = None
+
+    # Rate limiting (token bucket) por nombre de límite: "capacidad/segundos".
+    # Los endpoints que hashean con bcrypt sin estar logueados son los que hay que proteger.
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "local"  # "redis" comparte los buckets entre workers (usa CACHE_REDIS_URL)
+    rate_limit_max_claves: int = 100_000
+    rate_limits: Dict[str, str] = {"login": "10/60", "registro": "5/60"}
+
+    # Server-sent events de /<recurso>/changes/stream: cada cuánto se consultan los cambios,
+    # cada cuánto se manda un ping si no hubo nada y cuántos eventos se encolan por cliente
+    sse_interval: float = 1.0
+    sse_heartbeat: float = 15.0
+    sse_queue_size: int = 100
+    # Vigencia (segundos) de los tickets de /auth/stream-ticket con los que se abre el stream
+    sse_ticket_ttl: int = 60
+
+    # Tamaño máximo de las imágenes subidas
+    max_upload_bytes: int = 5 * 1024 * 1024
+
+    # Variantes WebP que se generan en segundo plano para cada imagen
+    image_variant_widths: List[int] = [160, 480, 1024]
+    image_workers: int = 2
+
+    # Compresión de respuestas de texto (JSON/NDJSON/CSV); brotli solo si el paquete está instalado
+    compression_enabled: bool = True
+    compression_min_bytes: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+
+    # Cache de lecturas del catálogo: "local" (LRU en proceso) o "redis" (compartida entre workers)
+    cache_backend: str = "local"
+    cache_redis_url: Optional[str] = None
+    cache_ttl: int = 60
+    cache_max_entradas: int = 512
+    # Filas por clave primaria para GET /<recurso>/{id} y /batch (0 la desactiva)
+    identity_cache_size: int = 10_000
+
+    # Importación/exportación masiva: filas por INSERT/commit y por fetch del cursor
+    import_batch_size: int = 1000
+    export_batch_size: int = 1000
+
+    # Pool de conexiones de SQLAlchemy
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800  # por debajo del wait_timeout de MySQL
+    db_pool_pre_ping: bool = True
+
+    # Réplica de lectura opcional: si no se define, las lecturas van al primario
+    db_replica_host: Optional[str] = None
+    db_replica_port: Optional[str] = None
+
+    # Hilos del threadpool donde FastAPI ejecuta los endpoints `def` (Session bloqueante)
+    threadpool_workers: int = 40
+
+    # Servidor de producción (`python main.py`): procesos uvicorn, conexiones que cada
+    # worker abre al arrancar y cuánto se espera a los requests en curso al apagarse.
+    # Con más de un worker hace falta redis (CACHE_BACKEND=redis, RATE_LIMIT_BACKEND=redis y
+    # CACHE_REDIS_URL): si no, caches, logout y rate limiting quedan por worker y no arranca
+    host: str = "0.0.0.0"
+    port: int = 8000
+    workers: int = 1
+    db_pool_prewarm: int = 5
+    graceful_shutdown_timeout: int = 30
+
+    # Métricas en /metrics (formato Prometheus); desactivadas no agregan middleware ni eventos
+    metrics_enabled: bool = False
+    slow_query_ms: float = 500
+
+    # Detector de N+1 para desarrollo/tests: avisa cuando una misma consulta se repite
+    # `threshold` veces en un request; en modo estricto además falla el request
+    # (y con él el test) si se repite o si se supera el presupuesto del endpoint
+    query_detector_enabled: bool = False
+    query_detector_threshold: int = 5
+    query_detector_strict: bool = False
 
     class Config:
         env_file = ".env"
 
     @property
     def database_url(self):
+        if self.db_url:
+            return self.db_url
         return f"mysql+pymysql://{self.db_user}:{self.db_password}@{self.db_host}:{self.db_port}/{self.db_name}"
 
+    @property
+    def replica_database_url(self):
+        if not self.db_replica_host:
+            return None
+        port = self.db_replica_port or self.db_port
+        return f"mysql+pymysql://{self.db_user}:{self.db_password}@{self.db_replica_host}:{port}/{self.db_name}"
+
 settings = Settings()
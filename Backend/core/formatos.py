@@ -0,0 +1,59 @@
+import csv
+import io
+import orjson
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, UploadFile
+
+FORMATOS = ("csv", "ndjson")
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+def detectar_formato(archivo: UploadFile, formato: Optional[str]) -> str:
+    if formato is None:
+        nombre = (archivo.filename or "").lower()
+        if nombre.endswith(".csv") or archivo.content_type == MEDIA_TYPES["csv"]:
+            formato = "csv"
+        elif nombre.endswith((".ndjson", ".jsonl")) or archivo.content_type == MEDIA_TYPES["ndjson"]:
+            formato = "ndjson"
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail="Formato no soportado. Debe ser csv o ndjson.")
+    return formato
+
+def leer_filas(archivo: UploadFile, formato: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """Itera el archivo de a una línea sin cargarlo entero: (número de línea, fila, error)."""
+    texto = io.TextIOWrapper(archivo.file, encoding="utf-8-sig", newline="")
+    if formato == "csv":
+        lector = csv.DictReader(texto)
+        for fila in lector:
+            # Las celdas vacías se tratan como campos ausentes (p.ej. imagen)
+            yield lector.line_num, {k: v for k, v in fila.items() if v != ""}, None
+        return
+
+    for numero, linea in enumerate(texto, start=1):
+        if not linea.strip():
+            continue
+        try:
+            fila = orjson.loads(linea)
+        except ValueError as e:
+            yield numero, None, f"JSON inválido: {e}"
+            continue
+        if not isinstance(fila, dict):
+            yield numero, None, "Cada línea debe ser un objeto JSON"
+            continue
+        yield numero, fila, None
+
+def en_lotes(iterable: Iterable, tamaño: int) -> Iterator[List]:
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamaño)):
+        yield lote
+
+def escribir_csv(filas: Iterable[Sequence], columnas: Optional[Sequence[str]] = None) -> str:
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    if columnas:
+        escritor.writerow(columnas)
+    escritor.writerows(filas)
+    return buffer.getvalue()
+
+def escribir_ndjson(filas: Iterable[Sequence], columnas: Sequence[str]) -> bytes:
+    return b"".join(orjson.dumps(dict(zip(columnas, fila))) + b"\n" for fila in filas)
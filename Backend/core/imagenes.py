@@ -0,0 +1,68 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from PIL import Image
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def _crear_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=settings.image_workers, thread_name_prefix="imagenes")
+
+_executor = _crear_executor()
+
+def ruta_variante(ruta: str, ancho: int) -> str:
+    base, _ = os.path.splitext(ruta)
+    return f"{base}_{ancho}.webp"
+
+def generar_variantes(ruta: str):
+    """Genera una versión WebP por cada ancho configurado que sea menor al original."""
+    with Image.open(ruta) as original:
+        original.load()
+        for ancho in settings.image_variant_widths:
+            destino = ruta_variante(ruta, ancho)
+            if original.width <= ancho or os.path.exists(destino):
+                continue
+            variante = original.copy()
+            variante.thumbnail((ancho, original.height))
+            temporal = f"{destino}.tmp"
+            variante.save(temporal, "WEBP", quality=80)
+            os.replace(temporal, destino)
+
+def _generar_con_log(ruta: str):
+    try:
+        generar_variantes(ruta)
+    except Exception:
+        logger.exception("No se pudieron generar las variantes de %s", ruta)
+
+def programar_variantes(ruta: str):
+    """Encola la generación de variantes fuera del request."""
+    _executor.submit(_generar_con_log, ruta)
+
+def esperar_pendientes():
+    """Espera a que terminen las variantes en curso (al apagar el worker).
+
+    El pool se reemplaza por uno nuevo por si la app vuelve a arrancar en el mismo proceso
+    (p.ej. varios `with TestClient(app)` seguidos).
+    """
+    global _executor
+    _executor.shutdown(wait=True)
+    _executor = _crear_executor()
+
+def habra_variante(ruta: str, ancho: int) -> bool:
+    """Si generar_variantes produce (o ya produjo) alguna variante que cubra `ancho`."""
+    candidatos = [c for c in settings.image_variant_widths if c >= ancho]
+    if not candidatos:
+        return False
+    # Solo lee la cabecera: el tamaño se conoce sin decodificar la imagen
+    with Image.open(ruta) as original:
+        return min(candidatos) < original.width
+
+def elegir_variante(ruta: str, ancho: Optional[int]) -> str:
+    """La variante más chica que cubra `ancho`; si no hay ninguna lista, el original."""
+    if ancho:
+        for candidato in sorted(settings.image_variant_widths):
+            if candidato >= ancho and os.path.exists(ruta_variante(ruta, candidato)):
+                return ruta_variante(ruta, candidato)
+    return ruta
@@ -0,0 +1,146 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from fastapi import HTTPException, Request
+from auth.auth_bearer import JWTBearer
+from core.config import settings
+from models.usuario import RolUser
+
+logger = logging.getLogger(__name__)
+
+def parsear_limite(limite: str) -> Tuple[int, float]:
+    """"10/60" -> hasta 10 requests de ráfaga, que se recargan a razón de 10 cada 60 segundos."""
+    capacidad, periodo = limite.split("/")
+    return int(capacidad), float(periodo)
+
+class LimitadorLocal:
+    """Token buckets en memoria del proceso (por worker). También sirve de stand-in del compartido."""
+
+    def __init__(self, max_claves: int):
+        self.max_claves = max_claves
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, clave: str, capacidad: int, periodo: float) -> float:
+        """Toma un token; devuelve 0 si había o los segundos hasta que haya uno."""
+        ahora = time.monotonic()
+        recarga = capacidad / periodo
+        with self._lock:
+            tokens, ultimo = self._buckets.pop(clave, (capacidad, ahora))
+            tokens = min(capacidad, tokens + (ahora - ultimo) * recarga)
+            espera = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                espera = (1 - tokens) / recarga
+            self._buckets[clave] = (tokens, ahora)
+            # Las claves más viejas son las de clientes que ya dejaron de pedir: su bucket estaría lleno
+            while len(self._buckets) > self.max_claves:
+                self._buckets.popitem(last=False)
+        return espera
+
+# Mismo algoritmo que LimitadorLocal, atómico en redis para compartir el límite entre workers
+_SCRIPT_REDIS = """
+local capacidad = tonumber(ARGV[1])
+local periodo = tonumber(ARGV[2])
+local ahora = tonumber(ARGV[3])
+local recarga = capacidad / periodo
+local estado = redis.call('HMGET', KEYS[1], 'tokens', 'ultimo')
+local tokens = tonumber(estado[1]) or capacidad
+local ultimo = tonumber(estado[2]) or ahora
+tokens = math.min(capacidad, tokens + math.max(0, ahora - ultimo) * recarga)
+local espera = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    espera = (1 - tokens) / recarga
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ultimo', ahora)
+redis.call('EXPIRE', KEYS[1], math.ceil(periodo) + 1)
+return tostring(espera)
+"""
+
+class LimitadorRedis:
+    """Token buckets en redis, compartidos por todos los workers y hosts."""
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+        self._script = cliente.register_script(_SCRIPT_REDIS)
+
+    def consumir(self, clave: str, capacidad: int, periodo: float) -> float:
+        return float(self._script(keys=[f"limite:{clave}"], args=[capacidad, periodo, time.time()]))
+
+def crear_limitador():
+    if settings.rate_limit_backend == "redis" and settings.cache_redis_url:
+        try:
+            import redis
+        except ImportError:
+            logger.warning("RATE_LIMIT_BACKEND=redis pero el paquete redis no está instalado; se usa el limitador local")
+        else:
+            return LimitadorRedis(redis.Redis.from_url(settings.cache_redis_url))
+    return LimitadorLocal(settings.rate_limit_max_claves)
+
+limitador = crear_limitador()
+
+class LimiteTasa:
+    """Dependencia que corta con 429 antes de tocar la base o bcrypt.
+
+    `nombre` busca el límite en RATE_LIMITS (sin entrada, no limita), así cada router
+    declara dónde se aplica y la configuración decide cuánto. Cada clave ("ip" o un campo
+    del cuerpo JSON, como "email") tiene su propio bucket: la IP frena ráfagas de un
+    cliente y el email frena ataques distribuidos contra una misma cuenta.
+
+    Con `salvo_administradores`, un request con token válido de administrador no consume
+    ni se frena: el límite es para el alta anónima, no para la carga desde el panel.
+    """
+
+    def __init__(self, nombre: str, claves: Tuple[str, ...] = ("ip",), salvo_administradores: bool = False):
+        self.nombre = nombre
+        self.claves = claves
+        self.salvo_administradores = salvo_administradores
+
+    async def __call__(self, request: Request):
+        limite = settings.rate_limits.get(self.nombre)
+        if not settings.rate_limit_enabled or not limite:
+            return
+        if self.salvo_administradores and self._es_administrador(request):
+            return
+        capacidad, periodo = parsear_limite(limite)
+
+        espera = 0.0
+        for clave in self.claves:
+            valor = await self._valor(request, clave)
+            if valor is not None:
+                espera = max(espera, limitador.consumir(f"{self.nombre}:{clave}:{valor}", capacidad, periodo))
+        if espera > 0:
+            raise HTTPException(
+                status_code=429,
+                detail="Demasiados intentos, probá de nuevo más tarde",
+                headers={"Retry-After": str(math.ceil(espera))},
+            )
+
+    @staticmethod
+    def _es_administrador(request: Request) -> bool:
+        # Un token inválido no es un error acá: el endpoint es público y se limita como anónimo
+        esquema, _, token = request.headers.get("authorization", "").partition(" ")
+        if esquema.lower() != "bearer" or not token:
+            return False
+        try:
+            payload = JWTBearer.validar(token)
+        except HTTPException:
+            return False
+        return payload.get("rol") == RolUser.Administrador
+
+    @staticmethod
+    async def _valor(request: Request, clave: str) -> Optional[str]:
+        if clave == "ip":
+            return request.client.host if request.client else None
+        try:
+            cuerpo = await request.json()
+        except ValueError:
+            return None
+        valor = cuerpo.get(clave) if isinstance(cuerpo, dict) else None
+        return str(valor).strip().lower() if valor is not None else None
@@ -0,0 +1,200 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_LATENCIA = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+BUCKETS_CONSULTAS = [1, 2, 5, 10, 20, 50, 100]
+
+class Histograma:
+    """Histograma acumulativo con etiquetas, en el formato que espera Prometheus."""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...], buckets: List[float]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.buckets = buckets
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, *etiquetas: str):
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                # [conteos por bucket..., +Inf, suma]
+                serie = self._series[etiquetas] = [0] * (len(self.buckets) + 1) + [0.0]
+            serie[bisect_left(self.buckets, valor)] += 1
+            serie[-1] += valor
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = [(k, list(v)) for k, v in self._series.items()]
+        for valores, serie in series:
+            base = _etiquetas(self.etiquetas, valores)
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + ["+Inf"], serie[:-1]):
+                acumulado += conteo
+                lineas.append(f'{self.nombre}_bucket{{{base}{"," if base else ""}le="{limite}"}} {acumulado}')
+            lineas.append(f"{self.nombre}_sum{{{base}}} {serie[-1]}")
+            lineas.append(f"{self.nombre}_count{{{base}}} {acumulado}")
+        return lineas
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._series: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, *etiquetas: str, valor: float = 1):
+        with self._lock:
+            self._series[etiquetas] = self._series.get(etiquetas, 0) + valor
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            series = list(self._series.items())
+        for valores, total in series:
+            lineas.append(f"{self.nombre}{{{_etiquetas(self.etiquetas, valores)}}} {total}")
+        return lineas
+
+def _etiquetas(nombres: Tuple[str, ...], valores: tuple) -> str:
+    return ",".join(f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores))
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+latencia_requests = Histograma(
+    "http_request_duration_seconds", "Latencia de los requests por ruta.",
+    ("method", "route", "status"), BUCKETS_LATENCIA,
+)
+consultas_por_request = Histograma(
+    "http_request_db_queries", "Consultas SQL emitidas por request.",
+    ("method", "route"), BUCKETS_CONSULTAS,
+)
+duracion_consultas = Histograma(
+    "db_query_duration_seconds", "Duración de las consultas SQL por engine.",
+    ("engine",), BUCKETS_LATENCIA,
+)
+consultas_lentas = Contador(
+    "db_slow_queries_total", "Consultas que superaron SLOW_QUERY_MS.", ("engine",),
+)
+duracion_operaciones = Histograma(
+    "app_operation_duration_seconds", "Tiempo en operaciones costosas (bcrypt, JWT).",
+    ("operation",), BUCKETS_LATENCIA,
+)
+
+class ConsultasRequest:
+    """Consultas emitidas durante el request en curso."""
+
+    def __init__(self):
+        self.cantidad = 0
+        self.tiempo = 0.0
+
+# Cada request fija su propio contador; los hilos del threadpool heredan el contexto
+consultas_actuales: ContextVar[Optional[ConsultasRequest]] = ContextVar("consultas_actuales", default=None)
+
+@contextmanager
+def medir(operacion: str):
+    """Registra cuánto tarda el bloque; no hace nada si las métricas están desactivadas."""
+    if not settings.metrics_enabled:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion_operaciones.observar(time.perf_counter() - inicio, operacion)
+
+def instrumentar_engine(engine, nombre: str):
+    """Engancha los eventos de cursor del engine para medir cada consulta y registrar las lentas."""
+    umbral = settings.slow_query_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("inicio_consulta", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        duracion = time.perf_counter() - conn.info["inicio_consulta"].pop()
+        duracion_consultas.observar(duracion, nombre)
+        actuales = consultas_actuales.get()
+        if actuales is not None:
+            actuales.cantidad += 1
+            actuales.tiempo += duracion
+        if duracion >= umbral:
+            consultas_lentas.incrementar(nombre)
+            logger.warning("Consulta lenta (%.1f ms) en %s: %s", duracion * 1000, nombre, statement)
+
+class MetricasMiddleware:
+    """Middleware ASGI que mide la latencia y las consultas de cada request.
+
+    Etiqueta por la plantilla de la ruta (`/productos/{id}`), no por la URL, para que
+    la cantidad de series no crezca con los ids.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estado = {"status": 500}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado["status"] = mensaje["status"]
+            await send(mensaje)
+
+        consultas = ConsultasRequest()
+        token = consultas_actuales.set(consultas)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracion = time.perf_counter() - inicio
+            consultas_actuales.reset(token)
+            ruta = scope.get("route")
+            plantilla = getattr(ruta, "path", None) or "sin_ruta"
+            latencia_requests.observar(duracion, scope["method"], plantilla, str(estado["status"]))
+            consultas_por_request.observar(consultas.cantidad, scope["method"], plantilla)
+
+def exponer_pool(engines: Dict[str, object]) -> List[str]:
+    from db.pool import estadisticas_pool
+
+    gauges = {
+        "en_uso": ("db_pool_checked_out", "gauge", "Conexiones en uso."),
+        "libres": ("db_pool_checked_in", "gauge", "Conexiones libres en el pool."),
+        "overflow": ("db_pool_overflow", "gauge", "Conexiones por encima de pool_size."),
+        "checkouts": ("db_pool_checkouts_total", "counter", "Checkouts de conexiones."),
+        "timeouts": ("db_pool_timeouts_total", "counter", "Checkouts que agotaron pool_timeout."),
+        "errores_conexion": ("db_pool_connect_errors_total", "counter", "Checkouts que fallaron al abrir la conexión."),
+        "espera_total_s": ("db_pool_wait_seconds_total", "counter", "Tiempo total esperando una conexión."),
+    }
+    estadisticas = {nombre: estadisticas_pool(engine) for nombre, engine in engines.items()}
+    lineas = []
+    for clave, (metrica, tipo, ayuda) in gauges.items():
+        lineas += [f"# HELP {metrica} {ayuda}", f"# TYPE {metrica} {tipo}"]
+        for nombre, datos in estadisticas.items():
+            if clave in datos:
+                lineas.append(f'{metrica}{{engine="{nombre}"}} {datos[clave]}')
+    return lineas
+
+def exponer(engines: Dict[str, object]) -> str:
+    """Todas las métricas en el formato de texto de Prometheus."""
+    lineas = []
+    for metrica in (latencia_requests, consultas_por_request, duracion_consultas, consultas_lentas, duracion_operaciones):
+        lineas += metrica.exponer()
+    lineas += exponer_pool(engines)
+    return "\n".join(lineas) + "\n"
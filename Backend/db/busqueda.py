@@ -0,0 +1,51 @@
+from typing import Tuple
+from sqlalchemy import case, func, literal, or_
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session
+
+from models.producto import Producto as ProductoModel
+
+# Límites de los rangos de precio que se informan como faceta
+RANGOS_PRECIO = [0, 10, 50, 100, 500, 1000]
+
+def condicion_busqueda(db: Session, texto: str) -> Tuple[object, object]:
+    """Devuelve (condición WHERE, expresión de relevancia) para buscar `texto` en los productos."""
+    if db.bind.dialect.name == "mysql":
+        # Usa el índice FULLTEXT (ngram); MATCH en el WHERE ya filtra relevancia > 0
+        relevancia = match(ProductoModel.nombre, ProductoModel.descripcion, against=texto).in_natural_language_mode()
+        return relevancia, relevancia
+
+    # Sin FULLTEXT (SQLite en desarrollo/benchmarks): LIKE por término, relevancia = términos encontrados
+    partes = [
+        or_(ProductoModel.nombre.contains(t, autoescape=True), ProductoModel.descripcion.contains(t, autoescape=True))
+        for t in texto.split()
+    ]
+    relevancia = sum((case((parte, 1), else_=0) for parte in partes), literal(0))
+    return or_(*partes), relevancia
+
+def rango_precio():
+    """Expresión con el índice del rango de RANGOS_PRECIO al que pertenece cada precio."""
+    return case(
+        *[(ProductoModel.precio < limite, i) for i, limite in enumerate(RANGOS_PRECIO[1:])],
+        else_=len(RANGOS_PRECIO) - 1,
+    )
+
+def facetas(sin_categoria, sin_precio) -> dict:
+    """Cuenta resultados por categoría y por rango de precio.
+
+    Cada conteo recibe la consulta con todos los filtros menos el de su propia faceta.
+    """
+    por_categoria = (
+        sin_categoria.with_entities(ProductoModel.categoria_producto, func.count(ProductoModel.id))
+        .group_by(ProductoModel.categoria_producto)
+        .order_by(func.count(ProductoModel.id).desc())
+        .all()
+    )
+    rango = rango_precio().label("rango")
+    por_precio = sin_precio.with_entities(rango, func.count(ProductoModel.id)).group_by(rango).order_by(rango).all()
+
+    limites = RANGOS_PRECIO + [None]
+    return {
+        "categorias": [{"categoria": c, "cantidad": n} for c, n in por_categoria],
+        "precios": [{"desde": limites[i], "hasta": limites[i + 1], "cantidad": n} for i, n in por_precio],
+    }
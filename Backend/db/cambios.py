@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import orjson
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+from anyio import to_thread
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, or_
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from db.database import ReplicaSessionLocal
+from models.eliminacion import Eliminacion
+
+logger = logging.getLogger(__name__)
+
+# Una transacción puede escribir `updated_at` y confirmar un rato después: el próximo `since`
+# se retrasa este margen para no saltear esas filas (a cambio de repetir alguna)
+MARGEN = timedelta(seconds=2)
+# Tope de la espera entre reintentos del sondeo cuando la base falla
+ESPERA_MAXIMA = 30.0
+
+def registrar_eliminaciones(db: Session, recurso: str, claves: List):
+    """Deja la marca de baja en la misma transacción que el DELETE."""
+    if claves:
+        db.execute(insert(Eliminacion), [{"recurso": recurso, "clave": str(clave)} for clave in claves])
+
+def exigir_sin_referencias(db: Session, columna, claves: List, detalle: str):
+    """409 si alguna clave sigue referenciada (p.ej. por ventas): la FK impediría el DELETE."""
+    referenciadas = [fila[0] for fila in db.query(columna).filter(columna.in_(claves)).distinct()]
+    if referenciadas:
+        raise HTTPException(status_code=409, detail=f"{detalle}: {', '.join(map(str, referenciadas))}")
+
+def consultar_cambios(
+    db: Session, recurso: str, query, columna_fecha, clave, desde: datetime, limite: int, cursor=None
+) -> dict:
+    """Filas posteriores a `(desde, cursor)` (por el índice) y bajas del recurso desde esa fecha.
+
+    `since` y `cursor` en la respuesta es lo que hay que mandar en la próxima llamada: como
+    en `paginar`, la clave desempata las filas con la misma `updated_at` (un UPDATE masivo
+    les pone a todas la misma). Si `completo` es falso quedaron cambios afuera por el límite
+    y conviene pedir de nuevo enseguida. Las filas pueden repetirse entre llamadas: el
+    cliente las aplica por clave.
+    """
+    if desde.tzinfo is not None:
+        # Las marcas se guardan en UTC sin zona (como `fecha` de las ventas)
+        desde = desde.astimezone(timezone.utc).replace(tzinfo=None)
+    tipo_clave = clave.type.python_type
+    if cursor is not None:
+        try:
+            cursor = tipo_clave(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Cursor inválido: {cursor}")
+
+    ahora = datetime.utcnow()
+    query = query.filter(columna_fecha >= desde)
+    if cursor is not None:
+        query = query.filter(or_(columna_fecha > desde, clave > cursor))
+    filas = query.order_by(columna_fecha, clave).limit(limite + 1).all()
+    completo = len(filas) <= limite
+    filas = filas[:limite]
+
+    if completo:
+        siguiente = max(desde, ahora - MARGEN)
+        siguiente_cursor = None
+        if siguiente == desde:
+            # `since` no avanzó (todo cae dentro del margen): el cursor evita repetir lo ya leído en `desde`
+            en_desde = [fila for fila in filas if fila.updated_at == desde]
+            siguiente_cursor = getattr(en_desde[-1], clave.key) if en_desde else cursor
+    else:
+        siguiente = filas[-1].updated_at
+        siguiente_cursor = getattr(filas[-1], clave.key)
+    bajas = (
+        db.query(Eliminacion.clave, Eliminacion.fecha)
+        .filter(Eliminacion.recurso == recurso, Eliminacion.fecha >= desde)
+        .order_by(Eliminacion.fecha)
+    )
+    if not completo:
+        bajas = bajas.filter(Eliminacion.fecha < siguiente)
+
+    return {
+        "cambios": [fila._asdict() for fila in filas],
+        "eliminados": [{clave.key: tipo_clave(baja.clave), "deleted_at": baja.fecha} for baja in bajas],
+        "since": siguiente,
+        "cursor": siguiente_cursor,
+        "completo": completo,
+    }
+
+def responder_cambios(resultado: dict) -> Response:
+    return Response(content=orjson.dumps(resultado), media_type="application/json")
+
+class CanalCambios:
+    """Server-sent events con los cambios de un recurso.
+
+    Un solo sondeo por worker y recurso (y solo mientras haya alguien conectado) consulta
+    los cambios cada SSE_INTERVAL segundos y los reparte a todas las conexiones. Como lee
+    de la base, ve también lo que escriben los otros workers y las importaciones.
+    """
+
+    def __init__(self, consultar: Callable[[Session, datetime, Optional[str]], dict], clave: str):
+        self.consultar = consultar
+        self.clave = clave
+        self._suscriptores = set()
+        self._tarea: Optional[asyncio.Task] = None
+
+    def _consultar_en_sesion(self, desde: datetime, cursor=None) -> dict:
+        db = ReplicaSessionLocal()
+        try:
+            return self.consultar(db, desde, cursor)
+        finally:
+            db.close()
+
+    def _nuevos(self, resultado: dict, enviados: set) -> dict:
+        """Descarta lo ya enviado en la ventana del margen, que el sondeo vuelve a leer."""
+        cambios = [f for f in resultado["cambios"] if (f[self.clave], f["updated_at"]) not in enviados]
+        eliminados = [f for f in resultado["eliminados"] if (f[self.clave], f["deleted_at"]) not in enviados]
+        enviados.update((f[self.clave], f["updated_at"]) for f in cambios)
+        enviados.update((f[self.clave], f["deleted_at"]) for f in eliminados)
+        return {**resultado, "cambios": cambios, "eliminados": eliminados}
+
+    async def _sondear(self, desde: datetime, cursor=None):
+        enviados = set()
+        espera = settings.sse_interval
+        try:
+            while self._suscriptores:
+                await asyncio.sleep(espera)
+                try:
+                    resultado = await to_thread.run_sync(self._consultar_en_sesion, desde, cursor)
+                except Exception:
+                    # Un corte de la réplica o un timeout del pool no puede matar el sondeo: los
+                    # clientes conectados se quedarían sin cambios. Se reintenta desde el mismo punto.
+                    espera = min(espera * 2, ESPERA_MAXIMA)
+                    logger.exception("Falló el sondeo de cambios; reintento en %.1f s", espera)
+                    continue
+                espera = settings.sse_interval
+                enviados = {e for e in enviados if e[1] >= desde}
+                nuevos = self._nuevos(resultado, enviados)
+                desde, cursor = resultado["since"], resultado["cursor"]
+                if not (nuevos["cambios"] or nuevos["eliminados"]):
+                    continue
+                for cola in list(self._suscriptores):
+                    try:
+                        cola.put_nowait(nuevos)
+                    except asyncio.QueueFull:
+                        # Cliente que no lee: se lo desconecta y al reconectar se pone al día con Last-Event-ID
+                        self._suscriptores.discard(cola)
+        finally:
+            self._tarea = None
+
+    @staticmethod
+    def _evento(resultado: dict) -> bytes:
+        # El id lleva `since` y el cursor, separados por "|", para retomar con Last-Event-ID
+        id_evento = resultado["since"].isoformat()
+        if resultado["cursor"] is not None:
+            id_evento += f"|{resultado['cursor']}"
+        return b"id: " + id_evento.encode() + b"\nevent: cambios\ndata: " + orjson.dumps(resultado) + b"\n\n"
+
+    async def _eventos(self, request: Request, desde: Optional[datetime], cursor: Optional[str]):
+        cola = asyncio.Queue(maxsize=settings.sse_queue_size)
+        # Suscripto antes de la puesta al día: lo que el sondeo encuentre mientras tanto queda en
+        # la cola (y lo repetido se descarta con `vistos`), así no se pierde nada en el medio
+        self._suscriptores.add(cola)
+        if self._tarea is None:
+            self._tarea = asyncio.create_task(self._sondear(datetime.utcnow()))
+        vistos = set()
+        try:
+            completo = desde is None
+            while not completo:
+                # Puesta al día de lo que pasó mientras no estaba conectado, hasta agotarla
+                resultado = await to_thread.run_sync(self._consultar_en_sesion, desde, cursor)
+                desde, cursor, completo = resultado["since"], resultado["cursor"], resultado["completo"]
+                resultado = self._nuevos(resultado, vistos)
+                if resultado["cambios"] or resultado["eliminados"]:
+                    yield self._evento(resultado)
+
+            yield b"retry: 3000\n\n"
+            while cola in self._suscriptores and not await request.is_disconnected():
+                try:
+                    resultado = await asyncio.wait_for(cola.get(), timeout=settings.sse_heartbeat)
+                except asyncio.TimeoutError:
+                    # Comentario SSE: mantiene viva la conexión a través de proxies
+                    yield b": ping\n\n"
+                    continue
+                resultado = self._nuevos(resultado, vistos)
+                # Los próximos sondeos solo traen marcas posteriores a `since`
+                vistos = {e for e in vistos if e[1] >= resultado["since"]}
+                if resultado["cambios"] or resultado["eliminados"]:
+                    yield self._evento(resultado)
+        finally:
+            self._suscriptores.discard(cola)
+
+    def responder(self, request: Request, desde: Optional[datetime], cursor: Optional[str] = None) -> StreamingResponse:
+        ultimo = request.headers.get("last-event-id")
+        if ultimo:
+            fecha, _, cursor_evento = ultimo.partition("|")
+            try:
+                desde = datetime.fromisoformat(fecha)
+                cursor = cursor_evento or None
+            except ValueError:
+                pass
+        return StreamingResponse(
+            self._eventos(request, desde, cursor),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
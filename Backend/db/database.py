@@ -1,17 +1,48 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, DateTime
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import sessionmaker, declarative_base
 from core.config import settings  # Importamos la instancia de Settings
+from db.pool import QueuePoolMedido
+from core.metricas import instrumentar_engine
+from db.detector import instrumentar_detector
 
 # Usamos la URL que se construye desde el archivo .env
 SQLALCHEMY_DATABASE_URL = settings.database_url
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+def crear_engine(url: str, nombre: str = "primario"):
+    # SQLite (benchmarks) comparte las conexiones del pool entre los hilos del threadpool
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(
+        url,
+        connect_args=connect_args,
+        poolclass=QueuePoolMedido,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+    if settings.metrics_enabled:
+        instrumentar_engine(engine, nombre)
+    if settings.query_detector_enabled:
+        instrumentar_detector(engine)
+    return engine
+
+engine = crear_engine(SQLALCHEMY_DATABASE_URL)
+
+# Si hay réplica configurada, los GET leen de ella; si no, del primario
+replica_engine = crear_engine(settings.replica_database_url, "replica") if settings.replica_database_url else engine
 
 # SessionLocal es una clase para crear sesiones
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
 
 Base = declarative_base()
 
+# DATETIME de MySQL sin fracción redondea al segundo: para sincronizar por `updated_at`
+# hacen falta microsegundos, o varios cambios del mismo segundo son indistinguibles
+MarcaTiempo = DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
+
 # Función generadora para usar en dependencias de FastAPI
 def get_db():
     db = SessionLocal()
@@ -19,3 +50,24 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Igual que get_db pero contra la réplica de lectura (solo para endpoints GET)
+def get_db_lectura():
+    db = ReplicaSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def precalentar_pool(engine, conexiones: int) -> int:
+    """Abre `conexiones` conexiones a la vez y las devuelve al pool, para que los primeros
+    requests no paguen el connect. Devuelve cuántas quedaron abiertas."""
+    conexiones = min(conexiones, settings.db_pool_size)
+    abiertas = []
+    try:
+        for _ in range(conexiones):
+            abiertas.append(engine.connect())
+    finally:
+        for conexion in abiertas:
+            conexion.close()
+    return len(abiertas)
@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import re
+import traceback
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Raíz del backend, para mostrar los frames como `routes/categorias.obtener_categorias`
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CARPETAS_APP = ("routes", "db", "core", "auth")
+
+class ExcesoConsultas(AssertionError):
+    """Un endpoint superó su presupuesto de consultas (solo con QUERY_DETECTOR_STRICT)."""
+
+class RegistroConsultas:
+    """Consultas emitidas durante un request, agrupadas por forma del statement."""
+
+    def __init__(self):
+        self.total = 0
+        self.por_forma: Dict[str, int] = {}
+        self.repetidas: List[str] = []
+        self.presupuesto: Optional[int] = None
+        self.ruta: Optional[str] = None
+
+registro_actual: ContextVar[Optional[RegistroConsultas]] = ContextVar("registro_consultas", default=None)
+
+_LISTA_PARAMETROS = re.compile(r"\((?:\s*(?:\?|%s|:\w+)\s*,)+\s*(?:\?|%s|:\w+)\s*\)")
+_NUMEROS = re.compile(r"\b\d+\b")
+
+def forma(statement: str) -> str:
+    """Normaliza un statement para que las variantes de la misma consulta cuenten juntas."""
+    statement = _LISTA_PARAMETROS.sub("(?)", statement)
+    statement = _NUMEROS.sub("N", statement)
+    return " ".join(statement.split())
+
+def frames_app(pila) -> List[str]:
+    """Frames de la pila que pertenecen al backend, como `carpeta/modulo.funcion:linea`."""
+    frames = []
+    for frame in pila:
+        ruta = os.path.relpath(os.path.abspath(frame.filename), RAIZ)
+        if ruta.split(os.sep)[0] in CARPETAS_APP:
+            modulo = ruta[:-3].replace(os.sep, "/") if ruta.endswith(".py") else ruta
+            frames.append(f"{modulo}.{frame.name}:{frame.lineno}")
+    return frames
+
+def instrumentar_detector(engine):
+    """Cuenta las consultas del request en curso y avisa cuando una forma se repite demasiado."""
+    umbral = settings.query_detector_threshold
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _contar(conn, cursor, statement, parameters, context, executemany):
+        registro = registro_actual.get()
+        if registro is None:
+            return
+        registro.total += 1
+        clave = forma(statement)
+        veces = registro.por_forma.get(clave, 0) + 1
+        registro.por_forma[clave] = veces
+        # La pila se arma una sola vez por forma, al cruzar el umbral: en un N+1 todas
+        # las repeticiones salen del mismo lugar
+        if veces == umbral:
+            frames = frames_app(traceback.extract_stack()[:-1])
+            origen = next((f for f in reversed(frames) if f.startswith("routes/")), "desconocido")
+            registro.repetidas.append(clave)
+            logger.warning(
+                "Posible N+1: la misma consulta se ejecutó %d veces en %s\n%s\nPila:\n  %s",
+                veces, origen, clave, "\n  ".join(reversed(frames)),
+            )
+
+class PresupuestoConsultas:
+    """Dependencia que declara cuántas consultas puede emitir un endpoint.
+
+    Sin el detector activo no hace nada, así que puede quedar declarada en producción.
+    """
+
+    def __init__(self, maximo: int):
+        self.maximo = maximo
+
+    async def __call__(self):
+        registro = registro_actual.get()
+        if registro is not None:
+            registro.presupuesto = self.maximo
+
+class DetectorConsultasMiddleware:
+    """Middleware ASGI que abre un RegistroConsultas por request y controla el presupuesto.
+
+    En modo estricto el control se hace antes de mandar el final de la respuesta: si falla,
+    el cliente recibe un 500 en lugar del 200 (o, si ya salió el inicio de un streaming, la
+    respuesta se corta) y además se lanza ExcesoConsultas para que el test lo vea.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def problemas(scope, registro: RegistroConsultas) -> List[str]:
+        ruta = getattr(scope.get("route"), "path", scope["path"])
+        encontrados = []
+        if registro.presupuesto is not None and registro.total > registro.presupuesto:
+            encontrados.append(
+                f"{scope['method']} {ruta} emitió {registro.total} consultas "
+                f"(presupuesto: {registro.presupuesto})"
+            )
+        if registro.repetidas:
+            encontrados.append(f"{scope['method']} {ruta} tiene consultas repetidas (N+1): {registro.repetidas}")
+        return encontrados
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registro = RegistroConsultas()
+        inicio = None
+        controlado = False
+
+        async def enviar(mensaje):
+            nonlocal inicio, controlado
+            if not settings.query_detector_strict:
+                await send(mensaje)
+                return
+            if mensaje["type"] == "http.response.start":
+                # Se retiene: si el endpoint se pasa del presupuesto todavía se puede responder 500
+                inicio = mensaje
+                return
+            if mensaje["type"] == "http.response.body" and not mensaje.get("more_body", False):
+                controlado = True
+                encontrados = self.problemas(scope, registro)
+                if encontrados:
+                    if inicio is not None:
+                        cuerpo = json.dumps({"detail": encontrados}).encode()
+                        await send({
+                            "type": "http.response.start",
+                            "status": 500,
+                            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(cuerpo)).encode())],
+                        })
+                        await send({"type": "http.response.body", "body": cuerpo})
+                    raise ExcesoConsultas("; ".join(encontrados))
+            if inicio is not None:
+                await send(inicio)
+                inicio = None
+            await send(mensaje)
+
+        token = registro_actual.set(registro)
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            registro_actual.reset(token)
+
+        if settings.query_detector_strict:
+            encontrados = [] if controlado else self.problemas(scope, registro)
+            if encontrados:
+                raise ExcesoConsultas("; ".join(encontrados))
+        elif registro.presupuesto is not None and registro.total > registro.presupuesto:
+            logger.error(self.problemas(scope, registro)[0])
@@ -0,0 +1,86 @@
+import orjson
+import unicodedata
+from typing import Callable, Dict, List, Optional
+from fastapi import HTTPException, Response
+
+from core.cache import cache_identidad
+from db.paginacion import LIMITE_MAXIMO, seleccionar_campos
+
+def parsear_claves(valores: List[str], tipo=str) -> List:
+    """Acepta `?ids=1,2,3` y también `?ids=1&ids=2`; respeta el orden y descarta repetidas."""
+    claves = []
+    for valor in valores:
+        for parte in valor.split(","):
+            parte = parte.strip()
+            if not parte:
+                continue
+            try:
+                clave = tipo(parte)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Clave inválida: {parte}")
+            if clave not in claves:
+                claves.append(clave)
+    if not claves:
+        raise HTTPException(status_code=400, detail="No se indicó ninguna clave")
+    if len(claves) > LIMITE_MAXIMO:
+        raise HTTPException(status_code=400, detail=f"Se pueden pedir hasta {LIMITE_MAXIMO} claves por vez")
+    return claves
+
+def plegar_clave(texto: str) -> str:
+    """Sin mayúsculas ni acentos, como compara MySQL con su collation por defecto (utf8mb4_0900_ai_ci)."""
+    descompuesto = unicodedata.normalize("NFKD", texto.casefold())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+def obtener_por_claves(
+    espacio: str, query, columna_clave, claves: List, normalizar: Optional[Callable] = None
+) -> Dict:
+    """{clave pedida: fila} con un solo `IN` para las que no estén en la cache de identidad.
+
+    Con `normalizar` (claves de texto que la base compara sin distinguir mayúsculas) la cache se
+    indexa por la clave normalizada: `Audio` y `audio` son la misma fila y la misma entrada.
+    """
+    if normalizar is None:
+        normalizar = lambda clave: clave
+    pedidas = {}
+    for clave in claves:
+        pedidas.setdefault(normalizar(clave), []).append(clave)
+
+    def cargar(faltantes: List) -> Dict:
+        originales = [clave for normalizada in faltantes for clave in pedidas[normalizada]]
+        filas = (fila._asdict() for fila in query.filter(columna_clave.in_(originales)))
+        return {normalizar(fila[columna_clave.key]): fila for fila in filas}
+
+    encontradas = cache_identidad.obtener_muchos(espacio, list(pedidas), cargar)
+    return {
+        clave: encontradas[normalizada]
+        for normalizada, originales in pedidas.items() if normalizada in encontradas
+        for clave in originales
+    }
+
+def proyectar(fila: dict, nombres: Optional[List[str]]) -> dict:
+    return fila if nombres is None else {nombre: fila[nombre] for nombre in nombres}
+
+def nombres_campos(fields: Optional[str], disponibles: Dict[str, object], clave: str) -> Optional[List[str]]:
+    """Los nombres pedidos en `fields` (validados como en los listados), o None para todos."""
+    if not fields:
+        return None
+    return [columna.name for columna in seleccionar_campos(fields, disponibles, clave)]
+
+def responder_uno(fila: Optional[dict], nombres: Optional[List[str]], detalle: str) -> Response:
+    if fila is None:
+        raise HTTPException(status_code=404, detail=detalle)
+    return Response(content=orjson.dumps(proyectar(fila, nombres)), media_type="application/json")
+
+def responder_lote(claves: List, encontradas: Dict, nombres: Optional[List[str]]) -> Response:
+    """Resultados en el orden pedido, con `null` en la posición de las claves inexistentes."""
+    resultados = []
+    no_encontrados = []
+    for clave in claves:
+        fila = encontradas.get(clave)
+        if fila is None:
+            no_encontrados.append(clave)
+            resultados.append(None)
+        else:
+            resultados.append(proyectar(fila, nombres))
+    contenido = {"resultados": resultados, "no_encontrados": no_encontrados}
+    return Response(content=orjson.dumps(contenido), media_type="application/json")
@@ -0,0 +1,92 @@
+import orjson
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+
+from core.cache import EntradaCache, cache_catalogo, calcular_etag
+from schemas.eliminacion import ModoEliminacion
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 1000
+HEADER_CURSOR = "X-Next-Cursor"
+
+def seleccionar_campos(fields: Optional[str], disponibles: Dict[str, object], clave: str) -> List:
+    """Traduce `fields=a,b` a la lista de columnas a seleccionar (la clave siempre se incluye).
+
+    Sin `fields` se seleccionan todas las columnas disponibles.
+    """
+    if not fields:
+        return [columna.label(nombre) for nombre, columna in disponibles.items()]
+
+    nombres = [f.strip() for f in fields.split(",") if f.strip()]
+    invalidos = [n for n in nombres if n not in disponibles]
+    if invalidos:
+        raise HTTPException(status_code=400, detail=f"Campos inválidos: {', '.join(invalidos)}")
+
+    if clave not in nombres:
+        nombres.insert(0, clave)
+    return [disponibles[n].label(n) for n in nombres]
+
+def paginar(query, clave, cursor, limite: Optional[int]):
+    """Paginación por keyset: filas con clave > cursor, ordenadas por la clave.
+
+    Devuelve (filas, siguiente_cursor). Sin `limite` se devuelve el listado completo.
+    """
+    if cursor is not None:
+        query = query.filter(clave > cursor)
+    query = query.order_by(clave)
+
+    if limite is None:
+        return query.all(), None
+
+    filas = query.limit(limite + 1).all()
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        siguiente = getattr(filas[-1], clave.key)
+    return filas, siguiente
+
+def primera_pagina(query, clave, limite: int):
+    """La página que devuelve un DELETE con `devolver=pagina`."""
+    return paginar(query, clave, None, limite)
+
+def responder_filas(filas, siguiente=None) -> Response:
+    """Serializa filas de columnas directo con orjson, sin ORM ni response_model de por medio.
+
+    Los datos vienen de la base y ya tienen los tipos del esquema: validarlos otra vez
+    con Pydantic solo costaría tiempo.
+    """
+    headers = {HEADER_CURSOR: str(siguiente)} if siguiente is not None else None
+    contenido = orjson.dumps([fila._asdict() for fila in filas])
+    return Response(content=contenido, media_type="application/json", headers=headers)
+
+def responder_cacheado(request: Request, espacio: str, obtener_pagina) -> Response:
+    """Como responder_filas, pero leyendo de la cache del catálogo y con ETag/If-None-Match."""
+    consulta = urlencode(sorted(request.query_params.multi_items()))
+
+    def calcular():
+        filas, siguiente = obtener_pagina()
+        cuerpo = orjson.dumps([fila._asdict() for fila in filas])
+        return EntradaCache(calcular_etag(cuerpo), str(siguiente) if siguiente is not None else None, cuerpo)
+
+    entrada = cache_catalogo.obtener_o_calcular(espacio, consulta, calcular)
+    headers = {"ETag": entrada.etag, "Cache-Control": "no-cache"}
+    if entrada.cursor is not None:
+        headers[HEADER_CURSOR] = entrada.cursor
+
+    # Comparación débil (RFC 9110): la compresión convierte el ETag en W/"..."
+    etags_cliente = [e.strip().removeprefix("W/") for e in request.headers.get("if-none-match", "").split(",")]
+    if entrada.etag in etags_cliente or "*" in etags_cliente:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entrada.cuerpo, media_type="application/json", headers=headers)
+
+def responder_eliminacion(modo: ModoEliminacion, eliminados: List, obtener_pagina=None):
+    """Por defecto un DELETE responde 204; `ids` devuelve el delta y `pagina` la primera página."""
+    if modo == ModoEliminacion.ids:
+        return JSONResponse(content={"eliminados": eliminados})
+
+    if modo == ModoEliminacion.pagina:
+        return responder_filas(*obtener_pagina())
+
+    return Response(status_code=204)
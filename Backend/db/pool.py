@@ -0,0 +1,57 @@
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+class QueuePoolMedido(QueuePool):
+    """QueuePool que mide cuánto esperan los checkouts por una conexión libre."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock_metricas = threading.Lock()
+        self.checkouts = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+        self.timeouts = 0
+        self.errores_conexion = 0
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._lock_metricas:
+                self.timeouts += 1
+            raise
+        except Exception:
+            # Pool con lugar, pero el connect falló (base caída, credenciales): no es saturación
+            with self._lock_metricas:
+                self.errores_conexion += 1
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            with self._lock_metricas:
+                self.checkouts += 1
+                self.espera_total += espera
+                self.espera_maxima = max(self.espera_maxima, espera)
+
+def estadisticas_pool(engine) -> dict:
+    pool = engine.pool
+    datos = {"estado": pool.status()}
+    if isinstance(pool, QueuePool):
+        datos.update(
+            tamaño=pool.size(),
+            en_uso=pool.checkedout(),
+            libres=pool.checkedin(),
+            overflow=pool.overflow(),
+        )
+    if isinstance(pool, QueuePoolMedido):
+        with pool._lock_metricas:
+            datos.update(
+                checkouts=pool.checkouts,
+                timeouts=pool.timeouts,
+                errores_conexion=pool.errores_conexion,
+                espera_total_s=round(pool.espera_total, 6),
+                espera_maxima_s=round(pool.espera_maxima, 6),
+            )
+    return datos
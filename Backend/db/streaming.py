@@ -0,0 +1,44 @@
+import orjson
+from fastapi.responses import StreamingResponse
+
+from core.config import settings
+from core.formatos import MEDIA_TYPES, escribir_csv, escribir_ndjson
+from db.database import ReplicaSessionLocal
+
+MEDIA_TYPES_STREAM = {**MEDIA_TYPES, "json": "application/json"}
+
+def _generar(statement, columnas, formato: str):
+    # Sesión propia: el generador sigue corriendo después de que el endpoint retornó
+    db = ReplicaSessionLocal()
+    try:
+        # yield_per activa stream_results: cursor del lado del servidor, de a un lote por vez
+        resultado = db.execute(statement, execution_options={"yield_per": settings.export_batch_size})
+        if formato == "csv":
+            yield escribir_csv([], columnas)
+        elif formato == "json":
+            yield b"["
+
+        primero = True
+        for filas in resultado.partitions():
+            if formato == "csv":
+                yield escribir_csv(filas)
+            elif formato == "ndjson":
+                yield escribir_ndjson(filas, columnas)
+            else:
+                cuerpo = b",".join(orjson.dumps(dict(zip(columnas, fila))) for fila in filas)
+                yield cuerpo if primero else b"," + cuerpo
+                primero = False
+
+        if formato == "json":
+            yield b"]"
+    finally:
+        db.close()
+
+def transmitir(query, formato: str, headers: dict = None) -> StreamingResponse:
+    """Devuelve el resultado de una consulta por columnas como stream (json, ndjson o csv)."""
+    columnas = [descripcion["name"] for descripcion in query.column_descriptions]
+    return StreamingResponse(
+        _generar(query.statement, columnas, formato),
+        media_type=MEDIA_TYPES_STREAM[formato],
+        headers=headers,
+    )
@@ -1,15 +1,55 @@
+# Primero: el arranque en frío se mide desde el inicio de los imports
+from core.arranque import estado_local, estado_servidor, precalentar_servidor, reintentar_precalentamiento
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from core.config import settings
+from core.compresion import CompresionMiddleware
+from core.imagenes import esperar_pendientes
+from core.metricas import MetricasMiddleware
+from db.database import engine, replica_engine
+from db.detector import DetectorConsultasMiddleware
+from db.paginacion import HEADER_CURSOR
 from routes.usuarios import router as UsuariosRouter
 from routes.productos import router as ProductosRouter
 from routes.categorias import router as CategoriasRouter
-# from routes.ventas import router as VentasRouter
+from routes.sistema import router as SistemaRouter, router_metricas as MetricasRouter
+from routes.imagenes import router as ImagenesRouter, ArchivosEstaticos
+from routes.ventas import router as VentasRouter
+from routes.analitica import router as AnaliticaRouter
 from routes import auth
 # from routes.descargas import router as DescargasRouter
 
+logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Los endpoints son `def` y corren en el threadpool de anyio: su tamaño limita
+    # cuántas consultas bloqueantes pueden estar en curso a la vez por worker.
+    to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_workers
 
-app = FastAPI()
+    # Precalentar antes de aceptar tráfico: los primeros requests no pagan connects ni cargas perezosas.
+    # Si falla (p.ej. MySQL todavía no responde) el worker arranca igual, sin estar listo, y reintenta
+    reintentos = None
+    if not await precalentar_servidor():
+        reintentos = asyncio.create_task(reintentar_precalentamiento())
+    yield
+
+    # uvicorn ya dejó de aceptar conexiones y esperó los requests en curso
+    # (hasta GRACEFUL_SHUTDOWN_TIMEOUT); falta el trabajo en segundo plano y el pool
+    if reintentos is not None:
+        reintentos.cancel()
+    estado_servidor.listo = False
+    await to_thread.run_sync(esperar_pendientes)
+    engine.dispose()
+    if replica_engine is not engine:
+        replica_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",
@@ -21,15 +61,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[HEADER_CURSOR, "ETag"],
 )
 
+if settings.compression_enabled:
+    app.add_middleware(CompresionMiddleware)
+if settings.metrics_enabled:
+    app.add_middleware(MetricasMiddleware)
+if settings.query_detector_enabled:
+    app.add_middleware(DetectorConsultasMiddleware)
+
 app.include_router(auth.router)
 app.include_router(UsuariosRouter)
 app.include_router(ProductosRouter)
 app.include_router(CategoriasRouter)
-# app.include_router(VentasRouter)
+app.include_router(SistemaRouter)
+app.include_router(MetricasRouter)
+app.include_router(ImagenesRouter)
+app.include_router(VentasRouter)
+app.include_router(AnaliticaRouter)
 # app.include_router(DescargasRouter)
 
+# Las rutas guardadas en la base ("static/productos/<hash>.png") se sirven tal cual
+os.makedirs("static", exist_ok=True)
+app.mount("/static", ArchivosEstaticos(directory="static"), name="static")
+
 if __name__ == "__main__":
+    import sys
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    locales = estado_local()
+    if settings.workers > 1 and locales:
+        # Cada worker tendría su propia copia: el logout no revoca en los demás, los límites
+        # se multiplican por WORKERS y las caches sirven datos viejos hasta su TTL
+        sys.exit(
+            f"WORKERS={settings.workers} requiere estado compartido en redis, pero esto es local: "
+            + "; ".join(locales)
+            + ". Configurá CACHE_BACKEND=redis, RATE_LIMIT_BACKEND=redis y CACHE_REDIS_URL, o usá WORKERS=1."
+        )
+    # Con varios workers uvicorn necesita la app como "modulo:atributo" para importarla en cada proceso
+    uvicorn.run(
+        "main:app",
+        host=settings.host,
+        port=settings.port,
+        workers=settings.workers,
+        timeout_graceful_shutdown=settings.graceful_shutdown_timeout,
+    )
@@ -0,0 +1,111 @@
+-- Cambios de esquema que necesita la API sobre la base existente (MySQL 8, InnoDB).
+--
+-- El esquema se administra fuera de la app: `Base.metadata.create_all` solo lo usan los
+-- benchmarks y los tests. Este script lleva una base creada con los modelos originales
+-- (usuarios, productos, categorias) a lo que esperan los modelos actuales.
+--
+-- Orden de despliegue:
+--   1. Aplicar este script con la versión anterior de la API todavía corriendo. Solo agrega
+--      columnas nullable, índices y tablas nuevas: el código viejo no las usa y sigue andando.
+--   2. Desplegar la API nueva. Antes del paso 1 fallaría en cada escritura de productos,
+--      usuarios y categorías (columna `updated_at` desconocida).
+--
+-- Se corre una sola vez (p.ej. `mysql <base> < migraciones/001_esquema_api.sql`). Si algún
+-- índice ya se había creado a mano, su CREATE INDEX falla con "Duplicate key name" y se
+-- puede saltear.
+
+-- ---------------------------------------------------------------------------------------
+-- Sincronización por cambios (/<recurso>/changes y /changes/stream)
+-- ---------------------------------------------------------------------------------------
+
+-- Marca de la última escritura, con microsegundos (la escribe el ORM en UTC)
+ALTER TABLE productos ADD COLUMN updated_at DATETIME(6) NULL;
+ALTER TABLE usuarios ADD COLUMN updated_at DATETIME(6) NULL;
+ALTER TABLE categorias ADD COLUMN updated_at DATETIME(6) NULL;
+
+-- Las filas existentes toman el momento de la migración: un cliente que sincronice desde
+-- antes las recibe todas una vez
+UPDATE productos SET updated_at = UTC_TIMESTAMP(6) WHERE updated_at IS NULL;
+UPDATE usuarios SET updated_at = UTC_TIMESTAMP(6) WHERE updated_at IS NULL;
+UPDATE categorias SET updated_at = UTC_TIMESTAMP(6) WHERE updated_at IS NULL;
+
+CREATE INDEX ix_productos_updated_at ON productos (updated_at);
+CREATE INDEX ix_usuarios_updated_at ON usuarios (updated_at);
+CREATE INDEX ix_categorias_updated_at ON categorias (updated_at);
+
+-- Marcas de las bajas: los DELETE siguen borrando la fila y dejan acá la clave
+CREATE TABLE eliminaciones (
+    id INTEGER NOT NULL AUTO_INCREMENT,
+    recurso VARCHAR(20),
+    clave VARCHAR(150),
+    fecha DATETIME(6),
+    PRIMARY KEY (id)
+);
+CREATE INDEX ix_eliminaciones_recurso_fecha ON eliminaciones (recurso, fecha);
+
+-- ---------------------------------------------------------------------------------------
+-- Índices de los filtros de los listados (sin ellos todo funciona, pero los filtros y los
+-- ORDER BY recorren la tabla completa)
+-- ---------------------------------------------------------------------------------------
+
+CREATE INDEX ix_productos_precio ON productos (precio);
+CREATE INDEX ix_productos_is_active ON productos (is_active);
+CREATE INDEX ix_productos_categoria_producto ON productos (categoria_producto);
+CREATE INDEX ix_usuarios_pais ON usuarios (pais);
+CREATE INDEX ix_usuarios_rol ON usuarios (rol);
+CREATE INDEX ix_usuarios_is_active ON usuarios (is_active);
+CREATE INDEX ix_categorias_is_active ON categorias (is_active);
+
+-- ---------------------------------------------------------------------------------------
+-- Búsqueda de productos (/productos/search): MATCH ... AGAINST falla si no existe el índice
+-- ---------------------------------------------------------------------------------------
+
+-- El primer índice FULLTEXT de una tabla InnoDB la reconstruye (agrega FTS_DOC_ID) y no
+-- admite escrituras concurrentes mientras tanto: en tablas grandes, correrlo fuera de hora
+CREATE FULLTEXT INDEX ft_productos_nombre_descripcion ON productos (nombre, descripcion) WITH PARSER ngram;
+
+-- ---------------------------------------------------------------------------------------
+-- Ventas y resúmenes diarios de analítica (requieren usuarios y productos)
+-- ---------------------------------------------------------------------------------------
+
+CREATE TABLE ventas (
+    id INTEGER NOT NULL AUTO_INCREMENT,
+    `idUsuario` INTEGER,
+    `idProducto` INTEGER,
+    cantidad INTEGER,
+    precio_unitario FLOAT,
+    categoria VARCHAR(100),
+    fecha DATETIME,
+    despachado ENUM('despachado','noDespachado'),
+    PRIMARY KEY (id),
+    FOREIGN KEY(`idUsuario`) REFERENCES usuarios (id),
+    FOREIGN KEY(`idProducto`) REFERENCES productos (id)
+);
+CREATE INDEX `ix_ventas_idUsuario` ON ventas (`idUsuario`);
+CREATE INDEX `ix_ventas_idProducto` ON ventas (`idProducto`);
+CREATE INDEX ix_ventas_fecha ON ventas (fecha);
+CREATE INDEX ix_ventas_despachado_fecha ON ventas (despachado, fecha);
+
+-- Sin FK a productos: el resumen es histórico y no debe impedir borrar un producto
+CREATE TABLE resumen_ventas_producto (
+    fecha DATE NOT NULL,
+    `idProducto` INTEGER NOT NULL,
+    cantidad INTEGER,
+    ingresos FLOAT,
+    ventas INTEGER,
+    PRIMARY KEY (fecha, `idProducto`)
+);
+CREATE INDEX `ix_resumen_ventas_producto_idProducto` ON resumen_ventas_producto (`idProducto`);
+
+CREATE TABLE resumen_ventas_categoria (
+    fecha DATE NOT NULL,
+    categoria VARCHAR(100) NOT NULL,
+    cantidad INTEGER,
+    ingresos FLOAT,
+    ventas INTEGER,
+    PRIMARY KEY (fecha, categoria)
+);
+CREATE INDEX ix_resumen_ventas_categoria_categoria ON resumen_ventas_categoria (categoria);
+
+-- Si ya había ventas cargadas por otra vía, los resúmenes se reconstruyen con
+-- POST /analitica/recalcular?desde=...&hasta=... una vez desplegada la API
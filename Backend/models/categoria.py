@@ -1,8 +1,11 @@
 from sqlalchemy import Column, String, Boolean
-from db.database import Base
+from datetime import datetime
+from db.database import Base, MarcaTiempo
 
 class Categoria(Base):
     __tablename__ = "categorias"
     nombre = Column(String(100), primary_key=True)
     descripcion = Column(String(255))
-    is_active = Column(Boolean)
+    is_active = Column(Boolean, index=True)
+    # Lo usan los endpoints /changes: cualquier INSERT/UPDATE lo actualiza
+    updated_at = Column(MarcaTiempo, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
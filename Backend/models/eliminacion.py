@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Index
+from datetime import datetime
+from db.database import Base, MarcaTiempo
+
+# Los DELETE siguen borrando la fila; acá queda la marca para que /changes informe la baja
+class Eliminacion(Base):
+    __tablename__ = "eliminaciones"
+    __table_args__ = (
+        Index("ix_eliminaciones_recurso_fecha", "recurso", "fecha"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    recurso = Column(String(20))
+    clave = Column(String(150))
+    fecha = Column(MarcaTiempo, default=datetime.utcnow)
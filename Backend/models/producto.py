@@ -1,14 +1,25 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey
-from db.database import Base
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Index
+from datetime import datetime
+from db.database import Base, MarcaTiempo
 
 class Producto(Base):
     __tablename__ = "productos"
+    __table_args__ = (
+        # Búsqueda de texto: el parser ngram indexa fragmentos de las palabras, así que
+        # también encuentra prefijos y palabras con algún error de tipeo
+        Index(
+            "ft_productos_nombre_descripcion", "nombre", "descripcion",
+            mysql_prefix="FULLTEXT", mysql_with_parser="ngram",
+        ),
+    )
+
     id = Column(Integer, primary_key=True, autoincrement=True)
     nombre = Column(String(100))
     descripcion = Column(String(255))
-    precio = Column(Float)
+    precio = Column(Float, index=True)
     stock = Column(Integer)
-    categoria_producto = Column(String(100), ForeignKey("categorias.nombre"))
-    is_active = Column(Boolean)
+    categoria_producto = Column(String(100), ForeignKey("categorias.nombre"), index=True)
+    is_active = Column(Boolean, index=True)
     imagen = Column(String(255), nullable=True)
-
+    # Lo usan los endpoints /changes: cualquier INSERT/UPDATE lo actualiza
+    updated_at = Column(MarcaTiempo, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Float, Date
+from db.database import Base
+
+# Rollups de ventas mantenidos en cada venta: las consultas por rango de fechas
+# leen a lo sumo una fila por día y producto/categoría, sin importar cuántas ventas haya.
+
+class ResumenVentaProducto(Base):
+    __tablename__ = "resumen_ventas_producto"
+    fecha = Column(Date, primary_key=True)
+    # Sin FK: el rollup es histórico (como `categoria`) y no debe impedir borrar el producto
+    idProducto = Column(Integer, primary_key=True, index=True)
+    cantidad = Column(Integer, default=0)
+    ingresos = Column(Float, default=0)
+    ventas = Column(Integer, default=0)
+
+class ResumenVentaCategoria(Base):
+    __tablename__ = "resumen_ventas_categoria"
+    fecha = Column(Date, primary_key=True)
+    categoria = Column(String(100), primary_key=True, index=True)
+    cantidad = Column(Integer, default=0)
+    ingresos = Column(Float, default=0)
+    ventas = Column(Integer, default=0)
@@ -1,5 +1,6 @@
 from sqlalchemy import Column, Integer, String, Boolean, Enum
-from db.database import Base
+from datetime import datetime
+from db.database import Base, MarcaTiempo
 import enum
 
 class RolUser(str, enum.Enum):
@@ -14,10 +15,12 @@ class Usuario(Base):
     apellido = Column(String(100))
     email = Column(String(150), unique=True, index=True)
     password = Column(String(255))
-    pais = Column(String(100))
+    pais = Column(String(100), index=True)
     ciudad = Column(String(100))
     direccion = Column(String(255))
     telefono = Column(String(50))
-    rol = Column(Enum(RolUser))
-    is_active = Column(Boolean)
+    rol = Column(Enum(RolUser), index=True)
+    is_active = Column(Boolean, index=True)
     imagen = Column(String(255), nullable=True)
+    # Lo usan los endpoints /changes: cualquier INSERT/UPDATE lo actualiza
+    updated_at = Column(MarcaTiempo, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, ForeignKey, Index
+from db.database import Base
+from datetime import datetime
+import enum
+
+class EstadoDespacho(str, enum.Enum):
+    despachado = "Despachado"
+    noDespachado = "No Despachado"
+
+class Venta(Base):
+    __tablename__ = "ventas"
+    __table_args__ = (
+        # Listados por estado ordenados por fecha (pendientes de despacho)
+        Index("ix_ventas_despachado_fecha", "despachado", "fecha"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    idUsuario = Column(Integer, ForeignKey("usuarios.id"), index=True)
+    idProducto = Column(Integer, ForeignKey("productos.id"), index=True)
+    cantidad = Column(Integer)
+    precio_unitario = Column(Float)
+    # Categoría del producto al momento de la venta (sin FK: es histórica), la de los rollups
+    categoria = Column(String(100), nullable=True)
+    fecha = Column(DateTime, default=datetime.utcnow, index=True)
+    despachado = Column(Enum(EstadoDespacho), default=EstadoDespacho.noDespachado)
@@ -0,0 +1,82 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional, Tuple
+from datetime import date, datetime, timedelta
+from sqlalchemy import Float, Integer, cast, func, type_coerce
+from sqlalchemy.orm import Session
+
+from auth.auth_bearer import JWTBearer
+from db.database import get_db, get_db_lectura
+from db.paginacion import responder_filas
+from db.resumenes import recalcular_resumenes
+from models.resumen_venta import ResumenVentaProducto, ResumenVentaCategoria
+
+router = APIRouter(prefix="/analitica", tags=["analitica"], dependencies=[Depends(JWTBearer())])
+
+DIAS_POR_DEFECTO = 30
+
+def rango(desde: Optional[date], hasta: Optional[date]) -> Tuple[date, date]:
+    """Rango [desde, hasta): por defecto los últimos 30 días incluyendo hoy (UTC, como las ventas)."""
+    hasta = hasta or datetime.utcnow().date() + timedelta(days=1)
+    desde = desde or hasta - timedelta(days=DIAS_POR_DEFECTO)
+    if desde >= hasta:
+        raise HTTPException(status_code=400, detail="'desde' debe ser anterior a 'hasta'")
+    return desde, hasta
+
+def totales(modelo):
+    # En MySQL SUM() de enteros devuelve DECIMAL, que llega como Decimal y orjson no lo
+    # serializa. MySQL no admite CAST a FLOAT: `ingresos` se convierte al leer el resultado.
+    return (
+        cast(func.sum(modelo.cantidad), Integer).label("cantidad"),
+        type_coerce(func.sum(modelo.ingresos), Float).label("ingresos"),
+        cast(func.sum(modelo.ventas), Integer).label("ventas"),
+    )
+
+@router.get("/ingresos/diarios")
+def ingresos_diarios(desde: Optional[date] = None, hasta: Optional[date] = None, db: Session = Depends(get_db_lectura)):
+    desde, hasta = rango(desde, hasta)
+    filas = (
+        db.query(ResumenVentaCategoria.fecha.label("fecha"), *totales(ResumenVentaCategoria))
+        .filter(ResumenVentaCategoria.fecha >= desde, ResumenVentaCategoria.fecha < hasta)
+        .group_by(ResumenVentaCategoria.fecha)
+        .order_by(ResumenVentaCategoria.fecha)
+        .all()
+    )
+    return responder_filas(filas)
+
+@router.get("/ingresos/productos")
+def ingresos_por_producto(
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    limite: int = Query(20, ge=1, le=1000),
+    db: Session = Depends(get_db_lectura)
+):
+    desde, hasta = rango(desde, hasta)
+    columnas = totales(ResumenVentaProducto)
+    filas = (
+        db.query(ResumenVentaProducto.idProducto.label("idProducto"), *columnas)
+        .filter(ResumenVentaProducto.fecha >= desde, ResumenVentaProducto.fecha < hasta)
+        .group_by(ResumenVentaProducto.idProducto)
+        .order_by(columnas[1].desc())
+        .limit(limite)
+        .all()
+    )
+    return responder_filas(filas)
+
+@router.get("/ingresos/categorias")
+def ingresos_por_categoria(desde: Optional[date] = None, hasta: Optional[date] = None, db: Session = Depends(get_db_lectura)):
+    desde, hasta = rango(desde, hasta)
+    columnas = totales(ResumenVentaCategoria)
+    filas = (
+        db.query(ResumenVentaCategoria.categoria.label("categoria"), *columnas)
+        .filter(ResumenVentaCategoria.fecha >= desde, ResumenVentaCategoria.fecha < hasta)
+        .group_by(ResumenVentaCategoria.categoria)
+        .order_by(columnas[1].desc())
+        .all()
+    )
+    return responder_filas(filas)
+
+@router.post("/recalcular")
+def recalcular(desde: date, hasta: date, db: Session = Depends(get_db)):
+    desde, hasta = rango(desde, hasta)
+    recalcular_resumenes(db, desde, hasta)
+    return {"status": "ok", "desde": desde, "hasta": hasta}
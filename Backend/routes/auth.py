@@ -4,30 +4,36 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from schemas.login import Login
 from models.usuario import Usuario, RolUser
-from auth.auth_handler import crear_token, validar_token
+from auth.auth_handler import crear_ticket_stream, crear_token, validar_token
+from auth.auth_bearer import JWTBearer
+from core.config import settings
 from db.database import get_db
-from passlib.context import CryptContext
+from auth.password_utils import verify_and_update_password
+from auth.token_cache import cache_tokens
+from core.limites import LimiteTasa
 
 
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def verificar_contraseña(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-@router.post("/login")
+@router.post("/login", dependencies=[Depends(LimiteTasa("login", claves=("ip", "email")))])
 def login(user: Login, db: Session = Depends(get_db)):
     db_user = db.query(Usuario).filter(Usuario.email == user.email).first()
 
     if not db_user:
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
 
-    if not verificar_contraseña(user.password, db_user.password):
+    valida, nuevo_hash = verify_and_update_password(user.password, db_user.password)
+    if not valida:
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
 
+    # Rehash transparente cuando cambió el coste configurado
+    if nuevo_hash:
+        db_user.password = nuevo_hash
+        db.commit()
+
     if db_user.rol != RolUser.Administrador:
         raise HTTPException(status_code=403, detail="Solo administradores pueden loguearse")
 
@@ -36,8 +42,20 @@ def login(user: Login, db: Session = Depends(get_db)):
 
 
 @router.get("/verify-token")
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    token = credentials.credentials
-    payload = validar_token(token)
+def verify_token(payload: dict = Depends(JWTBearer())):
+    # Misma verificación que los endpoints protegidos: denylist y cache de tokens
     return {"status": "ok", "payload": payload}
 
+
+@router.post("/stream-ticket")
+def stream_ticket(payload: dict = Depends(JWTBearer())):
+    # Para abrir /<recurso>/changes/stream?ticket=... sin poner el token de sesión en la URL
+    return {"ticket": crear_ticket_stream(payload), "expira_en": settings.sse_ticket_ttl}
+
+
+@router.post("/logout")
+def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    token = credentials.credentials
+    payload = validar_token(token)
+    cache_tokens.revocar(token, payload.get("exp"))
+    return {"status": "ok"}
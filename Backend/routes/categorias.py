@@ -1,26 +1,106 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 
-from db.database import get_db
-from auth.auth_bearer import JWTBearer
+from core.cache import cache_catalogo
+from db.database import get_db, get_db_lectura
+from db.cambios import CanalCambios, consultar_cambios, registrar_eliminaciones, responder_cambios
+from db.detector import PresupuestoConsultas
+from db.lotes import parsear_claves, obtener_por_claves, plegar_clave, nombres_campos, responder_uno, responder_lote
+from db.paginacion import (
+    LIMITE_POR_DEFECTO, LIMITE_MAXIMO, seleccionar_campos, paginar, primera_pagina, responder_cacheado,
+    responder_eliminacion
+)
+from auth.auth_bearer import JWTBearer, JWTBearerSSE
 from models.categoria import Categoria as CategoriaModel
 from models.producto import Producto as ProductoModel
 from schemas.categoria import CategoriaCreate, Categoria
+from schemas.eliminacion import ModoEliminacion, Eliminados
 
 router = APIRouter(prefix="/categorias", tags=["categorias"])
 
-@router.get("", response_model=List[Categoria], dependencies=[Depends(JWTBearer())])
-async def obtener_categorias(db: Session = Depends(get_db)):
-    categorias_db = db.query(CategoriaModel).all()
-    resultado = []
-    for c in categorias_db:
-        count = db.query(ProductoModel).filter(ProductoModel.categoria_producto == c.nombre).count()
-        resultado.append(Categoria(**c.__dict__, count_productos=count))
-    return resultado
+COLUMNAS_CATEGORIA = {
+    "nombre": CategoriaModel.nombre,
+    "descripcion": CategoriaModel.descripcion,
+    "is_active": CategoriaModel.is_active,
+    "count_productos": func.count(ProductoModel.id),
+}
+
+def consultar_categorias(db: Session, campos: Optional[List] = None):
+    # Un solo SELECT con LEFT JOIN + GROUP BY en lugar de un COUNT por categoría
+    if campos is None:
+        campos = seleccionar_campos(None, COLUMNAS_CATEGORIA, "nombre")
+    return (
+        db.query(*campos)
+        .outerjoin(ProductoModel, ProductoModel.categoria_producto == CategoriaModel.nombre)
+        .group_by(CategoriaModel.nombre, CategoriaModel.descripcion, CategoriaModel.is_active)
+    )
+
+def contar_productos(db: Session, nombre: str) -> int:
+    return db.query(func.count(ProductoModel.id)).filter(ProductoModel.categoria_producto == nombre).scalar()
+
+@router.get("", response_model=List[Categoria], dependencies=[Depends(JWTBearer()), Depends(PresupuestoConsultas(1))])
+def obtener_categorias(
+    request: Request,
+    cursor: Optional[str] = None,
+    limite: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO),
+    is_active: Optional[bool] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db_lectura)
+):
+    campos = seleccionar_campos(fields, COLUMNAS_CATEGORIA, "nombre")
+    query = consultar_categorias(db, campos)
+    if is_active is not None:
+        query = query.filter(CategoriaModel.is_active == is_active)
+
+    return responder_cacheado(request, "categorias", lambda: paginar(query, CategoriaModel.nombre, cursor, limite))
+
+def cambios_categorias(db: Session, desde: datetime, cursor: Optional[str] = None, limite: int = LIMITE_MAXIMO) -> dict:
+    campos = seleccionar_campos(None, COLUMNAS_CATEGORIA, "nombre") + [CategoriaModel.updated_at.label("updated_at")]
+    query = consultar_categorias(db, campos).group_by(CategoriaModel.updated_at)
+    return consultar_cambios(db, "categorias", query, CategoriaModel.updated_at, CategoriaModel.nombre, desde, limite, cursor)
+
+canal_categorias = CanalCambios(cambios_categorias, "nombre")
+
+@router.get("/changes", dependencies=[Depends(JWTBearer())])
+def obtener_cambios_categorias(
+    since: datetime,
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_MAXIMO, ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_db_lectura)
+):
+    return responder_cambios(cambios_categorias(db, since, cursor, limite))
+
+@router.get("/changes/stream", dependencies=[Depends(JWTBearerSSE())])
+async def transmitir_cambios_categorias(request: Request, since: Optional[datetime] = None, cursor: Optional[str] = None):
+    return canal_categorias.responder(request, since, cursor)
+
+# /batch antes de /{nombre}: si no, "batch" se tomaría como nombre de categoría
+@router.get("/batch", dependencies=[Depends(JWTBearer()), Depends(PresupuestoConsultas(1))])
+def obtener_categorias_por_nombres(
+    nombres: List[str] = Query(...),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db_lectura)
+):
+    claves = parsear_claves(nombres)
+    campos = nombres_campos(fields, COLUMNAS_CATEGORIA, "nombre")
+    encontradas = obtener_por_claves(
+        "categorias", consultar_categorias(db), CategoriaModel.nombre, claves, normalizar=plegar_clave
+    )
+    return responder_lote(claves, encontradas, campos)
+
+@router.get("/{nombre}", response_model=Categoria, dependencies=[Depends(JWTBearer()), Depends(PresupuestoConsultas(1))])
+def obtener_categoria(nombre: str, fields: Optional[str] = None, db: Session = Depends(get_db_lectura)):
+    campos = nombres_campos(fields, COLUMNAS_CATEGORIA, "nombre")
+    encontradas = obtener_por_claves(
+        "categorias", consultar_categorias(db), CategoriaModel.nombre, [nombre], normalizar=plegar_clave
+    )
+    return responder_uno(encontradas.get(nombre), campos, "Categoría no encontrada")
 
 @router.post("", response_model=Categoria, status_code=status.HTTP_201_CREATED)
-async def crear_categoria(categoria: CategoriaCreate, db: Session = Depends(get_db)):
+def crear_categoria(categoria: CategoriaCreate, db: Session = Depends(get_db)):
     existente = db.query(CategoriaModel).filter_by(nombre=categoria.nombre).first()
     if existente:
         raise HTTPException(status_code=400, detail="La categoría ya existe")
@@ -28,10 +108,11 @@ async def crear_categoria(categoria: CategoriaCreate, db: Session = Depends(get_
     nueva_categoria = CategoriaModel(**categoria.dict())
     db.add(nueva_categoria)
     db.commit()
-    return Categoria(**nueva_categoria.__dict__, count_productos=0)
+    cache_catalogo.invalidar("categorias")
+    return Categoria(**categoria.dict(), count_productos=0)
 
 @router.put("/{nombre}", response_model=Categoria, dependencies=[Depends(JWTBearer())])
-async def actualizar_categoria(nombre: str, datos: CategoriaCreate, db: Session = Depends(get_db)):
+def actualizar_categoria(nombre: str, datos: CategoriaCreate, db: Session = Depends(get_db)):
     categoria = db.query(CategoriaModel).filter_by(nombre=nombre).first()
     if not categoria:
         raise HTTPException(status_code=404, detail="Categoría no encontrada")
@@ -40,23 +121,61 @@ async def actualizar_categoria(nombre: str, datos: CategoriaCreate, db: Session
     categoria.is_active = datos.is_active
 
     db.commit()
-    count = db.query(ProductoModel).filter_by(categoria_producto=nombre).count()
-    return Categoria(**categoria.__dict__, count_productos=count)
+    cache_catalogo.invalidar("categorias")
+    return Categoria(
+        nombre=nombre,
+        descripcion=datos.descripcion,
+        is_active=datos.is_active,
+        count_productos=contar_productos(db, nombre),
+    )
 
-@router.delete("/{nombre}", response_model=List[Categoria], dependencies=[Depends(JWTBearer())])
-async def eliminar_categoria(nombre: str, db: Session = Depends(get_db)):
-    categoria = db.query(CategoriaModel).filter_by(nombre=nombre).first()
-    if not categoria:
-        raise HTTPException(status_code=404, detail="Categoría no encontrada")
+@router.delete("", response_model=Eliminados, dependencies=[Depends(JWTBearer())])
+def eliminar_categorias(
+    nombres: List[str] = Query(...),
+    devolver: ModoEliminacion = ModoEliminacion.ids,
+    limite: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_db)
+):
+    con_productos = [
+        fila.categoria_producto
+        for fila in db.query(ProductoModel.categoria_producto)
+        .filter(ProductoModel.categoria_producto.in_(nombres))
+        .distinct()
+    ]
+    if con_productos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No se pueden eliminar categorías con productos asociados: {', '.join(con_productos)}"
+        )
+
+    filtro = CategoriaModel.nombre.in_(nombres)
+    eliminados = [fila.nombre for fila in db.query(CategoriaModel.nombre).filter(filtro)]
+    db.query(CategoriaModel).filter(filtro).delete(synchronize_session=False)
+    registrar_eliminaciones(db, "categorias", eliminados)
+    db.commit()
+    cache_catalogo.invalidar("categorias")
 
-    productos_asociados = db.query(ProductoModel).filter(ProductoModel.categoria_producto == nombre).first()
+    return responder_eliminacion(devolver, eliminados, lambda: primera_pagina(consultar_categorias(db), CategoriaModel.nombre, limite))
+
+@router.delete("/{nombre}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(JWTBearer())])
+def eliminar_categoria(
+    nombre: str,
+    devolver: ModoEliminacion = ModoEliminacion.vacio,
+    limite: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_db)
+):
+    productos_asociados = db.query(ProductoModel.id).filter(ProductoModel.categoria_producto == nombre).first()
     if productos_asociados:
         raise HTTPException(
             status_code=400,
             detail="No se puede eliminar la categoría porque hay productos asociados a ella"
         )
 
-    db.delete(categoria)
+    borrados = db.query(CategoriaModel).filter(CategoriaModel.nombre == nombre).delete(synchronize_session=False)
+    if not borrados:
+        raise HTTPException(status_code=404, detail="Categoría no encontrada")
+    registrar_eliminaciones(db, "categorias", [nombre])
     db.commit()
-    return await obtener_categorias(db)
+    cache_catalogo.invalidar("categorias")
 
+    return responder_eliminacion(devolver, [nombre], lambda: primera_pagina(consultar_categorias(db), CategoriaModel.nombre, limite))
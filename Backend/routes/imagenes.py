@@ -0,0 +1,51 @@
+import os
+import re
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+from typing import Optional
+
+from core.imagenes import elegir_variante, habra_variante
+
+router = APIRouter(prefix="/imagenes", tags=["imagenes"])
+
+CARPETAS = {"productos", "usuarios"}
+
+# Los nombres son el hash del contenido: una misma URL nunca cambia de bytes
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+CACHE_CORTO = "public, max-age=60"
+# sha256 del original, con sufijo _<ancho> en las variantes WebP
+NOMBRE_POR_CONTENIDO = re.compile(r"^[0-9a-f]{64}(_\d+)?\.\w+$")
+
+def cache_para(archivo: str) -> str:
+    """Inmutable para los nombres por contenido; corto para los anteriores al hashing."""
+    return CACHE_INMUTABLE if NOMBRE_POR_CONTENIDO.match(os.path.basename(archivo)) else CACHE_CORTO
+
+class ArchivosEstaticos(StaticFiles):
+    """StaticFiles de /static con Cache-Control según el nombre y sin exponer subidas a medio escribir.
+
+    FileResponse ya resuelve ETag/Last-Modified, 304, Range y, si el servidor ASGI soporta
+    `http.response.pathsend`, el envío sin copias.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        if str(full_path).endswith(".tmp"):
+            raise HTTPException(status_code=404, detail="Not Found")
+        respuesta = super().file_response(full_path, stat_result, scope, status_code)
+        respuesta.headers["Cache-Control"] = cache_para(str(full_path))
+        return respuesta
+
+@router.get("/{carpeta}/{archivo}")
+def obtener_imagen(carpeta: str, archivo: str, ancho: Optional[int] = Query(None, ge=1)):
+    if carpeta not in CARPETAS or os.path.basename(archivo) != archivo:
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+
+    ruta = f"static/{carpeta}/{archivo}"
+    if not os.path.isfile(ruta):
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+
+    servida = elegir_variante(ruta, ancho)
+    # Si se pidió un tamaño que todavía no está generado, no fijar el original para siempre;
+    # si no se va a generar nunca (original chico o ancho mayor a todos), el original es la respuesta
+    cache = CACHE_CORTO if ancho and servida == ruta and habra_variante(ruta, ancho) else cache_para(servida)
+    return FileResponse(servida, headers={"Cache-Control": cache})
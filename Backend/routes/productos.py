@@ -1,23 +1,150 @@
-from fastapi import APIRouter, Form, File, UploadFile, HTTPException, status, Depends
+from fastapi import APIRouter, Form, File, UploadFile, HTTPException, status, Depends, Query, Request, Response
 from typing import Optional, List
-import shutil
+from datetime import datetime
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
 
 from models.producto import Producto as ProductoModel
 from models.categoria import Categoria as CategoriaModel
-from auth.auth_bearer import JWTBearer
-from db.database import get_db
-from schemas.producto import Producto  
+from models.venta import Venta as VentaModel
+from auth.auth_bearer import JWTBearer, JWTBearerSSE
+from core.almacenamiento import descartar_si_falla, recibir_imagen
+from core.cache import cache_catalogo
+from core.config import settings
+from core.formatos import detectar_formato, leer_filas, en_lotes
+from db.database import get_db, get_db_lectura
+from db.detector import PresupuestoConsultas
+from db.lotes import parsear_claves, obtener_por_claves, nombres_campos, responder_uno, responder_lote
+from db.paginacion import (
+    LIMITE_POR_DEFECTO, LIMITE_MAXIMO, seleccionar_campos, paginar, primera_pagina, responder_cacheado,
+    responder_eliminacion
+)
+from db.streaming import transmitir
+from db.busqueda import condicion_busqueda, facetas
+from db.cambios import (
+    CanalCambios, consultar_cambios, exigir_sin_referencias, registrar_eliminaciones, responder_cambios
+)
+from schemas.producto import Producto, ProductoCreate, ErrorImportacion, ResultadoImportacion
+from schemas.eliminacion import ModoEliminacion, Eliminados
 
 router = APIRouter(prefix="/productos", tags=["productos"])
 
-@router.get("", response_model=List[Producto], dependencies=[Depends(JWTBearer())])
-async def obtener_productos(db: Session = Depends(get_db)):
-    return db.query(ProductoModel).all()
+# Las ventas son históricas y su FK impide borrar: en ese caso se desactiva
+CON_VENTAS = "No se pueden eliminar productos con ventas registradas (se pueden desactivar con is_active=false)"
+
+COLUMNAS_PRODUCTO = {
+    "id": ProductoModel.id,
+    **{campo: getattr(ProductoModel, campo) for campo in ProductoCreate.model_fields},
+}
+MAX_ERRORES_REPORTADOS = 100
+
+def consultar_productos(db: Session):
+    return db.query(*seleccionar_campos(None, COLUMNAS_PRODUCTO, "id"))
+
+@router.get("", response_model=List[Producto], dependencies=[Depends(JWTBearer()), Depends(PresupuestoConsultas(1))])
+def obtener_productos(
+    request: Request,
+    cursor: Optional[int] = None,
+    limite: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO),
+    is_active: Optional[bool] = None,
+    categoria_producto: Optional[str] = None,
+    precio_min: Optional[float] = None,
+    precio_max: Optional[float] = None,
+    fields: Optional[str] = None,
+    stream: Optional[str] = Query(None, pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_db_lectura)
+):
+    query = db.query(*seleccionar_campos(fields, COLUMNAS_PRODUCTO, "id"))
+
+    if is_active is not None:
+        query = query.filter(ProductoModel.is_active == is_active)
+    if categoria_producto is not None:
+        query = query.filter(ProductoModel.categoria_producto == categoria_producto)
+    if precio_min is not None:
+        query = query.filter(ProductoModel.precio >= precio_min)
+    if precio_max is not None:
+        query = query.filter(ProductoModel.precio <= precio_max)
+
+    # Modo stream: listado completo por cursor del servidor, sin armar la lista en memoria
+    if stream:
+        if cursor is not None:
+            query = query.filter(ProductoModel.id > cursor)
+        return transmitir(query.order_by(ProductoModel.id), stream)
+
+    return responder_cacheado(request, "productos", lambda: paginar(query, ProductoModel.id, cursor, limite))
+
+
+@router.get("/search", dependencies=[Depends(JWTBearer()), Depends(PresupuestoConsultas(4))])
+def buscar_productos(
+    q: str = Query(..., min_length=2),
+    pagina: int = Query(1, ge=1),
+    limite: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    categoria_producto: Optional[str] = None,
+    precio_min: Optional[float] = None,
+    precio_max: Optional[float] = None,
+    is_active: Optional[bool] = None,
+    db: Session = Depends(get_db_lectura)
+):
+    condicion, relevancia = condicion_busqueda(db, q)
+    base = db.query(ProductoModel).filter(condicion)
+    if is_active is not None:
+        base = base.filter(ProductoModel.is_active == is_active)
+
+    por_precio = []
+    if precio_min is not None:
+        por_precio.append(ProductoModel.precio >= precio_min)
+    if precio_max is not None:
+        por_precio.append(ProductoModel.precio <= precio_max)
+    por_categoria = []
+    if categoria_producto is not None:
+        por_categoria.append(ProductoModel.categoria_producto == categoria_producto)
+
+    # Cada faceta ignora solo su propio filtro: las categorías se cuentan con el rango de precio
+    # elegido y los rangos con la categoría elegida, para poder cambiar una sin perder la otra
+    resumen = facetas(base.filter(*por_precio), base.filter(*por_categoria))
+    query = base.filter(*por_precio, *por_categoria)
+
+    total = query.with_entities(func.count(ProductoModel.id)).scalar()
+    filas = (
+        query.with_entities(*seleccionar_campos(None, COLUMNAS_PRODUCTO, "id"), relevancia.label("relevancia"))
+        .order_by(relevancia.desc(), ProductoModel.id)
+        .offset((pagina - 1) * limite)
+        .limit(limite)
+        .all()
+    )
+    contenido = {
+        "total": total,
+        "pagina": pagina,
+        "resultados": [fila._asdict() for fila in filas],
+        "facetas": resumen,
+    }
+    return Response(content=orjson.dumps(contenido), media_type="application/json")
+
+
+def cambios_productos(db: Session, desde: datetime, cursor: Optional[str] = None, limite: int = LIMITE_MAXIMO) -> dict:
+    query = consultar_productos(db).add_columns(ProductoModel.updated_at.label("updated_at"))
+    return consultar_cambios(db, "productos", query, ProductoModel.updated_at, ProductoModel.id, desde, limite, cursor)
+
+canal_productos = CanalCambios(cambios_productos, "id")
+
+@router.get("/changes", dependencies=[Depends(JWTBearer())])
+def obtener_cambios_productos(
+    since: datetime,
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_MAXIMO, ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_db_lectura)
+):
+    return responder_cambios(cambios_productos(db, since, cursor, limite))
+
+@router.get("/changes/stream", dependencies=[Depends(JWTBearerSSE())])
+async def transmitir_cambios_productos(request: Request, since: Optional[datetime] = None, cursor: Optional[str] = None):
+    return canal_productos.responder(request, since, cursor)
 
 
 @router.post("", response_model=Producto, status_code=status.HTTP_201_CREATED, dependencies=[Depends(JWTBearer())])
-async def crear_producto(
+def crear_producto(
     nombre: str = Form(...),
     descripcion: str = Form(...),
     precio: float = Form(...),
@@ -27,41 +154,156 @@ async def crear_producto(
     imagen: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db)
 ):
-    
-    categoria = db.query(CategoriaModel).filter(CategoriaModel.nombre == categoria_producto).first()
-    if not categoria:
-        nueva_categoria = CategoriaModel(
-            nombre=categoria_producto,
-            descripcion="Categoría generada automáticamente",
-            is_active=True
+    # La imagen se valida antes de tocar la base: si se rechaza no queda una categoría huérfana
+    subida = recibir_imagen(imagen, "static/productos") if imagen else None
+
+    with descartar_si_falla(subida):
+        categoria = db.query(CategoriaModel).filter(CategoriaModel.nombre == categoria_producto).first()
+        if not categoria:
+            nueva_categoria = CategoriaModel(
+                nombre=categoria_producto,
+                descripcion="Categoría generada automáticamente",
+                is_active=True
+            )
+            db.add(nueva_categoria)
+            # Sin commit: la categoría se confirma junto con el producto
+            db.flush()
+
+        nuevo_producto = ProductoModel(
+            nombre=nombre,
+            descripcion=descripcion,
+            precio=precio,
+            stock=stock,
+            categoria_producto=categoria_producto,
+            is_active=is_active,
+            imagen=subida.ruta if subida else None
         )
-        db.add(nueva_categoria)
+        db.add(nuevo_producto)
+        if subida:
+            subida.confirmar()
         db.commit()
+    cache_catalogo.invalidar("productos", "categorias")
+    db.refresh(nuevo_producto)
+    return nuevo_producto
 
-    url_imagen = None
-    if imagen:
-        ruta = f"static/productos/{imagen.filename}"
-        with open(ruta, "wb") as buffer:
-            shutil.copyfileobj(imagen.file, buffer)
-        url_imagen = ruta
 
-    nuevo_producto = ProductoModel(
-        nombre=nombre,
-        descripcion=descripcion,
-        precio=precio,
-        stock=stock,
-        categoria_producto=categoria_producto,
-        is_active=is_active,
-        imagen=url_imagen
+@router.post("/importar", response_model=ResultadoImportacion, dependencies=[Depends(JWTBearer())])
+def importar_productos(
+    archivo: UploadFile = File(...),
+    formato: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    formato = detectar_formato(archivo, formato)
+    insertados = 0
+    rechazados = 0
+    errores = []
+    categorias_creadas = []
+    categorias_conocidas = set()
+
+    # Cada lote es una transacción: un INSERT multi-fila de productos y, si hace falta, otro de categorías
+    for lote in en_lotes(leer_filas(archivo, formato), settings.import_batch_size):
+        validos = []
+        for linea, fila, error in lote:
+            if error is None:
+                try:
+                    validos.append(ProductoCreate.model_validate(fila).model_dump())
+                    continue
+                except ValidationError as e:
+                    error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            rechazados += 1
+            if len(errores) < MAX_ERRORES_REPORTADOS:
+                errores.append(ErrorImportacion(linea=linea, detalle=error))
+
+        if not validos:
+            continue
+
+        nombres = {p["categoria_producto"] for p in validos} - categorias_conocidas
+        if nombres:
+            existentes = {c.nombre for c in db.query(CategoriaModel.nombre).filter(CategoriaModel.nombre.in_(nombres))}
+            nuevas = sorted(nombres - existentes)
+            if nuevas:
+                db.execute(insert(CategoriaModel), [
+                    dict(nombre=nombre, descripcion="Categoría generada automáticamente", is_active=True)
+                    for nombre in nuevas
+                ])
+                categorias_creadas.extend(nuevas)
+            categorias_conocidas |= nombres
+
+        db.execute(insert(ProductoModel), validos)
+        db.commit()
+        cache_catalogo.invalidar("productos", "categorias")
+        insertados += len(validos)
+
+    return ResultadoImportacion(
+        insertados=insertados,
+        rechazados=rechazados,
+        categorias_creadas=categorias_creadas,
+        errores=errores,
     )
-    db.add(nuevo_producto)
-    db.commit()
-    db.refresh(nuevo_producto)
-    return nuevo_producto
+
+
+@router.get("/exportar", dependencies=[Depends(JWTBearer())])
+def exportar_productos(
+    formato: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+    db: Session = Depends(get_db_lectura)
+):
+    return transmitir(
+        consultar_productos(db).order_by(ProductoModel.id),
+        formato,
+        headers={"Content-Disposition": f'attachment; filename="productos.{formato}"'},
+    )
+
+# /batch antes de /{id}: si no, "batch" se intentaría leer como id
+@router.get("/batch", dependencies=[Depends(JWTBearer()), Depends(PresupuestoConsultas(1))])
+def obtener_productos_por_ids(
+    ids: List[str] = Query(...),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db_lectura)
+):
+    claves = parsear_claves(ids, int)
+    nombres = nombres_campos(fields, COLUMNAS_PRODUCTO, "id")
+    encontrados = obtener_por_claves("productos", consultar_productos(db), ProductoModel.id, claves)
+    return responder_lote(claves, encontrados, nombres)
+
+
+@router.get("/{id}", response_model=Producto, dependencies=[Depends(JWTBearer()), Depends(PresupuestoConsultas(1))])
+def obtener_producto(id: int, fields: Optional[str] = None, db: Session = Depends(get_db_lectura)):
+    nombres = nombres_campos(fields, COLUMNAS_PRODUCTO, "id")
+    encontrados = obtener_por_claves("productos", consultar_productos(db), ProductoModel.id, [id])
+    return responder_uno(encontrados.get(id), nombres, "Producto no encontrado")
+
+
+def aplicar_cambios_producto(db: Session, id: int, cambios: dict, imagen: Optional[UploadFile]) -> ProductoModel:
+    """Aplica solo los campos recibidos con un único UPDATE (sin cargar el producto antes)."""
+    # Validar que la categoría existe
+    if "categoria_producto" in cambios:
+        categoria = db.query(CategoriaModel.nombre).filter(CategoriaModel.nombre == cambios["categoria_producto"]).first()
+        if not categoria:
+            raise HTTPException(status_code=400, detail=f"La categoría '{cambios['categoria_producto']}' no existe")
+
+    subida = recibir_imagen(imagen, "static/productos") if imagen else None
+    if subida:
+        cambios["imagen"] = subida.ruta
+
+    with descartar_si_falla(subida):
+        if cambios:
+            actualizados = db.query(ProductoModel).filter(ProductoModel.id == id).update(cambios, synchronize_session=False)
+        else:
+            actualizados = db.query(ProductoModel.id).filter(ProductoModel.id == id).count()
+        if not actualizados:
+            db.rollback()
+            raise HTTPException(status_code=404, detail="Producto no encontrado")
+
+        if subida:
+            subida.confirmar()
+        db.commit()
+    cache_catalogo.invalidar("productos", "categorias")
+
+    return db.get(ProductoModel, id)
 
 
 @router.put("/{id}", response_model=Producto, dependencies=[Depends(JWTBearer())])
-async def actualizar_producto(
+def actualizar_producto(
     id: int,
     nombre: str = Form(...),
     descripcion: str = Form(...),
@@ -72,44 +314,71 @@ async def actualizar_producto(
     imagen: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db)
 ):
-    producto = db.query(ProductoModel).filter(ProductoModel.id == id).first()
+    cambios = dict(
+        nombre=nombre,
+        descripcion=descripcion,
+        precio=precio,
+        stock=stock,
+        categoria_producto=categoria_producto,
+        is_active=is_active,
+    )
+    return aplicar_cambios_producto(db, id, cambios, imagen)
 
-    if not producto:
-        raise HTTPException(status_code=404, detail="Producto no encontrado")
 
-    # Validar que la categoría existe
-    categoria = db.query(CategoriaModel).filter(CategoriaModel.nombre == categoria_producto).first()
-    if not categoria:
-        raise HTTPException(status_code=400, detail=f"La categoría '{categoria_producto}' no existe")
-
-    url_imagen = producto.imagen
-    if imagen:
-        ruta = f"static/productos/{imagen.filename}"
-        with open(ruta, "wb") as buffer:
-            shutil.copyfileobj(imagen.file, buffer)
-        url_imagen = ruta
-
-    producto.nombre = nombre
-    producto.descripcion = descripcion
-    producto.precio = precio
-    producto.stock = stock
-    producto.categoria_producto = categoria_producto
-    producto.is_active = is_active
-    producto.imagen = url_imagen
+@router.patch("/{id}", response_model=Producto, dependencies=[Depends(JWTBearer())])
+def actualizar_producto_parcial(
+    id: int,
+    nombre: Optional[str] = Form(None),
+    descripcion: Optional[str] = Form(None),
+    precio: Optional[float] = Form(None),
+    stock: Optional[int] = Form(None),
+    categoria_producto: Optional[str] = Form(None),
+    is_active: Optional[bool] = Form(None),
+    imagen: Optional[UploadFile] = File(None),
+    db: Session = Depends(get_db)
+):
+    cambios = dict(
+        nombre=nombre,
+        descripcion=descripcion,
+        precio=precio,
+        stock=stock,
+        categoria_producto=categoria_producto,
+        is_active=is_active,
+    )
+    return aplicar_cambios_producto(db, id, {k: v for k, v in cambios.items() if v is not None}, imagen)
 
+
+@router.delete("", response_model=Eliminados, dependencies=[Depends(JWTBearer())])
+def eliminar_productos(
+    ids: List[int] = Query(...),
+    devolver: ModoEliminacion = ModoEliminacion.ids,
+    limite: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_db)
+):
+    exigir_sin_referencias(db, VentaModel.idProducto, ids, CON_VENTAS)
+    filtro = ProductoModel.id.in_(ids)
+    eliminados = [fila.id for fila in db.query(ProductoModel.id).filter(filtro)]
+    db.query(ProductoModel).filter(filtro).delete(synchronize_session=False)
+    registrar_eliminaciones(db, "productos", eliminados)
     db.commit()
-    db.refresh(producto)
-    return producto
+    cache_catalogo.invalidar("productos", "categorias")
 
+    return responder_eliminacion(devolver, eliminados, lambda: primera_pagina(consultar_productos(db), ProductoModel.id, limite))
 
-@router.delete("/{id}", response_model=List[Producto], dependencies=[Depends(JWTBearer())])
-async def eliminar_producto(id: int, db: Session = Depends(get_db)):
-    producto = db.query(ProductoModel).filter(ProductoModel.id == id).first()
 
-    if not producto:
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(JWTBearer())])
+def eliminar_producto(
+    id: int,
+    devolver: ModoEliminacion = ModoEliminacion.vacio,
+    limite: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_db)
+):
+    exigir_sin_referencias(db, VentaModel.idProducto, [id], CON_VENTAS)
+    borrados = db.query(ProductoModel).filter(ProductoModel.id == id).delete(synchronize_session=False)
+    if not borrados:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
-
-    db.delete(producto)
+    registrar_eliminaciones(db, "productos", [id])
     db.commit()
+    cache_catalogo.invalidar("productos", "categorias")
 
-    return db.query(ProductoModel).all()
+    return responder_eliminacion(devolver, [id], lambda: primera_pagina(consultar_productos(db), ProductoModel.id, limite))
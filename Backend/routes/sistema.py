@@ -0,0 +1,54 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Response
+
+from auth.auth_bearer import JWTBearer
+from db.database import engine, replica_engine
+from db.pool import estadisticas_pool
+from core.config import settings
+from core.metricas import exponer
+from core.arranque import estado_servidor
+from test_connection import verificar_conexion
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/sistema", tags=["sistema"])
+
+@router.get("/pool", dependencies=[Depends(JWTBearer())])
+def obtener_estadisticas_pool():
+    datos = {"primario": estadisticas_pool(engine)}
+    if replica_engine is not engine:
+        datos["replica"] = estadisticas_pool(replica_engine)
+    return datos
+
+# Liveness: el proceso responde. No toca la base para que un corte de MySQL no reinicie los workers
+@router.get("/live")
+def liveness():
+    return {"status": "ok"}
+
+# Readiness: precalentado, no apagándose y con la base (y la réplica) respondiendo
+@router.get("/ready")
+def readiness():
+    if not estado_servidor.listo:
+        raise HTTPException(status_code=503, detail="Worker arrancando o apagándose")
+    engines = {"primario": engine}
+    if replica_engine is not engine:
+        engines["replica"] = replica_engine
+    for nombre, motor in engines.items():
+        error = verificar_conexion(motor)
+        if error is not None:
+            # El detalle del driver (host, usuario) va al log: /ready no pide autenticación
+            logger.warning("Readiness: sin conexión a la base (%s): %s", nombre, error)
+            raise HTTPException(status_code=503, detail="Sin conexión a la base")
+    return {"status": "ok", "arranque_s": estado_servidor.arranque_s}
+
+# Prometheus espera /metrics en la raíz y sin autenticación: se protege a nivel de red
+router_metricas = APIRouter(tags=["sistema"])
+
+@router_metricas.get("/metrics", include_in_schema=False)
+def obtener_metricas():
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Métricas desactivadas")
+    engines = {"primario": engine}
+    if replica_engine is not engine:
+        engines["replica"] = replica_engine
+    return Response(content=exponer(engines), media_type="text/plain; version=0.0.4")
@@ -1,23 +1,108 @@
-from fastapi import APIRouter, HTTPException, Form, UploadFile, File, Depends, status
+from fastapi import APIRouter, HTTPException, Form, UploadFile, File, Depends, status, Query, Request
 from typing import List, Optional
-import shutil
+from datetime import datetime
 from sqlalchemy.orm import Session
 
 from models.usuario import Usuario, RolUser
-from schemas.usuario import UsuarioCreate, UsuarioResponse
-from auth.auth_bearer import JWTBearer
-from db.database import get_db
+from models.venta import Venta as VentaModel
+from schemas.usuario import UsuarioCreate, UsuarioUpdate, UsuarioResponse
+from auth.auth_bearer import JWTBearer, JWTBearerSSE
+from core.almacenamiento import descartar_si_falla, recibir_imagen
+from core.limites import LimiteTasa
+from db.database import get_db, get_db_lectura
+from db.cambios import (
+    CanalCambios, consultar_cambios, exigir_sin_referencias, registrar_eliminaciones, responder_cambios
+)
+from db.detector import PresupuestoConsultas
+from db.lotes import parsear_claves, obtener_por_claves, nombres_campos, responder_uno, responder_lote
+from db.paginacion import (
+    LIMITE_POR_DEFECTO, LIMITE_MAXIMO, seleccionar_campos, paginar, primera_pagina, responder_filas,
+    responder_eliminacion
+)
+from db.streaming import transmitir
+from core.cache import cache_catalogo
+from schemas.eliminacion import ModoEliminacion, Eliminados
 from auth.password_utils import hash_password
 
 router = APIRouter(prefix="/usuarios", tags=["usuarios"])
 
-@router.get("", response_model=List[UsuarioResponse], dependencies=[Depends(JWTBearer())])
-async def obtener_usuarios(db: Session = Depends(get_db)):
-    usuarios_db = db.query(Usuario).all()
-    return usuarios_db
+# Las ventas son históricas y su FK impide borrar: en ese caso se desactiva
+CON_VENTAS = "No se pueden eliminar usuarios con ventas registradas (se pueden desactivar con is_active=false)"
 
-@router.post("", response_model=UsuarioResponse, status_code=status.HTTP_201_CREATED)
-async def crear_usuario(
+# Solo se exponen los campos de UsuarioResponse (nunca el hash de la password)
+COLUMNAS_USUARIO = {campo: getattr(Usuario, campo) for campo in UsuarioResponse.model_fields}
+
+def consultar_usuarios(db: Session):
+    return db.query(*seleccionar_campos(None, COLUMNAS_USUARIO, "id"))
+
+@router.get("", response_model=List[UsuarioResponse], dependencies=[Depends(JWTBearer()), Depends(PresupuestoConsultas(1))])
+def obtener_usuarios(
+    cursor: Optional[int] = None,
+    limite: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO),
+    is_active: Optional[bool] = None,
+    rol: Optional[RolUser] = None,
+    pais: Optional[str] = None,
+    fields: Optional[str] = None,
+    stream: Optional[str] = Query(None, pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_db_lectura)
+):
+    query = db.query(*seleccionar_campos(fields, COLUMNAS_USUARIO, "id"))
+
+    if is_active is not None:
+        query = query.filter(Usuario.is_active == is_active)
+    if rol is not None:
+        query = query.filter(Usuario.rol == rol)
+    if pais is not None:
+        query = query.filter(Usuario.pais == pais)
+
+    # Modo stream: listado completo por cursor del servidor, sin armar la lista en memoria
+    if stream:
+        if cursor is not None:
+            query = query.filter(Usuario.id > cursor)
+        return transmitir(query.order_by(Usuario.id), stream)
+
+    usuarios_db, siguiente = paginar(query, Usuario.id, cursor, limite)
+    return responder_filas(usuarios_db, siguiente)
+
+def cambios_usuarios(db: Session, desde: datetime, cursor: Optional[str] = None, limite: int = LIMITE_MAXIMO) -> dict:
+    query = consultar_usuarios(db).add_columns(Usuario.updated_at.label("updated_at"))
+    return consultar_cambios(db, "usuarios", query, Usuario.updated_at, Usuario.id, desde, limite, cursor)
+
+canal_usuarios = CanalCambios(cambios_usuarios, "id")
+
+@router.get("/changes", dependencies=[Depends(JWTBearer())])
+def obtener_cambios_usuarios(
+    since: datetime,
+    cursor: Optional[str] = None,
+    limite: int = Query(LIMITE_MAXIMO, ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_db_lectura)
+):
+    return responder_cambios(cambios_usuarios(db, since, cursor, limite))
+
+@router.get("/changes/stream", dependencies=[Depends(JWTBearerSSE())])
+async def transmitir_cambios_usuarios(request: Request, since: Optional[datetime] = None, cursor: Optional[str] = None):
+    return canal_usuarios.responder(request, since, cursor)
+
+# /batch antes de /{id}: si no, "batch" se intentaría leer como id
+@router.get("/batch", dependencies=[Depends(JWTBearer()), Depends(PresupuestoConsultas(1))])
+def obtener_usuarios_por_ids(
+    ids: List[str] = Query(...),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db_lectura)
+):
+    claves = parsear_claves(ids, int)
+    nombres = nombres_campos(fields, COLUMNAS_USUARIO, "id")
+    encontrados = obtener_por_claves("usuarios", consultar_usuarios(db), Usuario.id, claves)
+    return responder_lote(claves, encontrados, nombres)
+
+@router.get("/{id}", response_model=UsuarioResponse, dependencies=[Depends(JWTBearer()), Depends(PresupuestoConsultas(1))])
+def obtener_usuario(id: int, fields: Optional[str] = None, db: Session = Depends(get_db_lectura)):
+    nombres = nombres_campos(fields, COLUMNAS_USUARIO, "id")
+    encontrados = obtener_por_claves("usuarios", consultar_usuarios(db), Usuario.id, [id])
+    return responder_uno(encontrados.get(id), nombres, "Usuario no encontrado")
+
+@router.post("", response_model=UsuarioResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(LimiteTasa("registro", salvo_administradores=True))])
+def crear_usuario(
     nombre: str = Form(...),
     apellido: str = Form(...),
     email: str = Form(...),
@@ -31,13 +116,6 @@ async def crear_usuario(
     imagen: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db)
 ):
-    url_imagen = None
-    if imagen:
-        ruta = f"static/usuarios/{imagen.filename}"
-        with open(ruta, "wb") as buffer:
-            shutil.copyfileobj(imagen.file, buffer)
-        url_imagen = ruta
-
     try:
         rol_enum = RolUser(rol)
     except ValueError:
@@ -55,8 +133,7 @@ async def crear_usuario(
             direccion=direccion,
             telefono=telefono,
             rol=rol_enum,
-            is_active=is_active,
-            imagen=url_imagen
+            is_active=is_active
         )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -65,33 +142,79 @@ async def crear_usuario(
     if existing_user:
         raise HTTPException(status_code=400, detail="El email ya está registrado")
 
-    usuario_db = Usuario(
-        nombre=nombre,
-        apellido=apellido,
-        email=email,
-        password=hash_password(password),
-        pais=pais,
-        ciudad=ciudad,
-        direccion=direccion,
-        telefono=telefono,
-        rol=rol_enum,
-        is_active=is_active,
-        imagen=url_imagen
-    )
+    # La imagen se guarda recién cuando los datos ya fueron validados
+    subida = recibir_imagen(imagen, "static/usuarios") if imagen else None
 
-    db.add(usuario_db)
-    db.commit()
+    with descartar_si_falla(subida):
+        usuario_db = Usuario(
+            nombre=nombre,
+            apellido=apellido,
+            email=email,
+            password=hash_password(password),
+            pais=pais,
+            ciudad=ciudad,
+            direccion=direccion,
+            telefono=telefono,
+            rol=rol_enum,
+            is_active=is_active,
+            imagen=subida.ruta if subida else None
+        )
+
+        db.add(usuario_db)
+        if subida:
+            subida.confirmar()
+        db.commit()
+    cache_catalogo.invalidar("usuarios")
     db.refresh(usuario_db)
 
     return usuario_db
 
+def aplicar_cambios_usuario(db: Session, id: int, valores: dict, imagen: Optional[UploadFile]) -> Usuario:
+    """Aplica solo los campos recibidos con un único UPDATE (sin cargar el usuario antes)."""
+    if valores.get("rol") is not None:
+        try:
+            RolUser(valores["rol"])
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Rol inválido. Debe ser Cliente o Administrador.")
+
+    try:
+        datos = UsuarioUpdate(**valores)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    cambios = datos.model_dump(exclude_unset=True)
+    if "rol" in cambios:
+        cambios["rol"] = RolUser(cambios["rol"])
+    # Solo se paga bcrypt cuando realmente llega una password nueva
+    if cambios.get("password"):
+        cambios["password"] = hash_password(cambios["password"])
+    subida = recibir_imagen(imagen, "static/usuarios") if imagen else None
+    if subida:
+        cambios["imagen"] = subida.ruta
+
+    with descartar_si_falla(subida):
+        if cambios:
+            actualizados = db.query(Usuario).filter(Usuario.id == id).update(cambios, synchronize_session=False)
+        else:
+            actualizados = db.query(Usuario.id).filter(Usuario.id == id).count()
+        if not actualizados:
+            db.rollback()
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+
+        if subida:
+            subida.confirmar()
+        db.commit()
+    cache_catalogo.invalidar("usuarios")
+
+    return db.get(Usuario, id)
+
 @router.put("/{id}", response_model=UsuarioResponse, dependencies=[Depends(JWTBearer())])
-async def actualizar_usuario(
+def actualizar_usuario(
     id: int,
     nombre: str = Form(...),
     apellido: str = Form(...),
     email: str = Form(...),
-    password: str = Form(...),
+    password: Optional[str] = Form(None),
     pais: str = Form(...),
     ciudad: str = Form(...),
     direccion: str = Form(...),
@@ -101,64 +224,81 @@ async def actualizar_usuario(
     imagen: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db)
 ):
-    usuario_db = db.query(Usuario).filter(Usuario.id == id).first()
-    if not usuario_db:
-        raise HTTPException(status_code=404, detail="Usuario no encontrado")
-
-    url_imagen = usuario_db.imagen
-    if imagen:
-        ruta = f"static/usuarios/{imagen.filename}"
-        with open(ruta, "wb") as buffer:
-            shutil.copyfileobj(imagen.file, buffer)
-        url_imagen = ruta
-
-    try:
-        rol_enum = RolUser(rol)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Rol inválido. Debe ser Cliente o Administrador.")
-
-    try:
-        UsuarioCreate(
-            nombre=nombre,
-            apellido=apellido,
-            email=email,
-            password=password,
-            pais=pais,
-            ciudad=ciudad,
-            direccion=direccion,
-            telefono=telefono,
-            rol=rol_enum,
-            is_active=is_active,
-            imagen=url_imagen
-        )
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    valores = dict(
+        nombre=nombre,
+        apellido=apellido,
+        email=email,
+        pais=pais,
+        ciudad=ciudad,
+        direccion=direccion,
+        telefono=telefono,
+        rol=rol,
+        is_active=is_active,
+    )
+    if password:
+        valores["password"] = password
+    return aplicar_cambios_usuario(db, id, valores, imagen)
 
-    usuario_db.nombre = nombre
-    usuario_db.apellido = apellido
-    usuario_db.email = email
-    usuario_db.password = hash_password(password)
-    usuario_db.pais = pais
-    usuario_db.ciudad = ciudad
-    usuario_db.direccion = direccion
-    usuario_db.telefono = telefono
-    usuario_db.rol = rol_enum
-    usuario_db.is_active = is_active
-    usuario_db.imagen = url_imagen
+@router.patch("/{id}", response_model=UsuarioResponse, dependencies=[Depends(JWTBearer())])
+def actualizar_usuario_parcial(
+    id: int,
+    nombre: Optional[str] = Form(None),
+    apellido: Optional[str] = Form(None),
+    email: Optional[str] = Form(None),
+    password: Optional[str] = Form(None),
+    pais: Optional[str] = Form(None),
+    ciudad: Optional[str] = Form(None),
+    direccion: Optional[str] = Form(None),
+    telefono: Optional[str] = Form(None),
+    rol: Optional[str] = Form(None),
+    is_active: Optional[bool] = Form(None),
+    imagen: Optional[UploadFile] = File(None),
+    db: Session = Depends(get_db)
+):
+    valores = dict(
+        nombre=nombre,
+        apellido=apellido,
+        email=email,
+        password=password,
+        pais=pais,
+        ciudad=ciudad,
+        direccion=direccion,
+        telefono=telefono,
+        rol=rol,
+        is_active=is_active,
+    )
+    return aplicar_cambios_usuario(db, id, {k: v for k, v in valores.items() if v is not None}, imagen)
 
+@router.delete("", response_model=Eliminados, dependencies=[Depends(JWTBearer())])
+def eliminar_usuarios(
+    ids: List[int] = Query(...),
+    devolver: ModoEliminacion = ModoEliminacion.ids,
+    limite: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_db)
+):
+    exigir_sin_referencias(db, VentaModel.idUsuario, ids, CON_VENTAS)
+    filtro = Usuario.id.in_(ids)
+    eliminados = [fila.id for fila in db.query(Usuario.id).filter(filtro)]
+    db.query(Usuario).filter(filtro).delete(synchronize_session=False)
+    registrar_eliminaciones(db, "usuarios", eliminados)
     db.commit()
-    db.refresh(usuario_db)
+    cache_catalogo.invalidar("usuarios")
 
-    return usuario_db
+    return responder_eliminacion(devolver, eliminados, lambda: primera_pagina(consultar_usuarios(db), Usuario.id, limite))
 
-@router.delete("/{id}", response_model=List[UsuarioResponse], dependencies=[Depends(JWTBearer())])
-async def eliminar_usuario(id: int, db: Session = Depends(get_db)):
-    usuario_db = db.query(Usuario).filter(Usuario.id == id).first()
-    if not usuario_db:
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(JWTBearer())])
+def eliminar_usuario(
+    id: int,
+    devolver: ModoEliminacion = ModoEliminacion.vacio,
+    limite: int = Query(LIMITE_POR_DEFECTO, ge=1, le=LIMITE_MAXIMO),
+    db: Session = Depends(get_db)
+):
+    exigir_sin_referencias(db, VentaModel.idUsuario, [id], CON_VENTAS)
+    borrados = db.query(Usuario).filter(Usuario.id == id).delete(synchronize_session=False)
+    if not borrados:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-
-    db.delete(usuario_db)
+    registrar_eliminaciones(db, "usuarios", [id])
     db.commit()
+    cache_catalogo.invalidar("usuarios")
 
-    usuarios_restantes = db.query(Usuario).all()
-    return usuarios_restantes
+    return responder_eliminacion(devolver, [id], lambda: primera_pagina(consultar_usuarios(db), Usuario.id, limite))
@@ -1,33 +1,107 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from typing import List, Optional
+from datetime import datetime
+from sqlalchemy.orm import Session
 
-from models.venta import Venta, EstadoDespacho
+from models.venta import Venta as VentaModel, EstadoDespacho
+from models.producto import Producto as ProductoModel
+from models.usuario import Usuario
+from schemas.venta import Venta, VentaCreate
 from auth.auth_bearer import JWTBearer
-from db.fake_db import ventas, usuarios, productos
+from core.cache import cache_catalogo
+from db.database import get_db, get_db_lectura
+from db.detector import PresupuestoConsultas
+from db.paginacion import LIMITE_MAXIMO, seleccionar_campos, paginar, responder_filas
+from db.resumenes import registrar_venta
 
 router = APIRouter(prefix="/ventas", tags=["ventas"])
 
-@router.get("", response_model=List[Venta], dependencies=[Depends(JWTBearer())])
-async def obtener_ventas():
-    return ventas
+COLUMNAS_VENTA = {campo: getattr(VentaModel, campo) for campo in Venta.model_fields}
+
+@router.get("", response_model=List[Venta], dependencies=[Depends(JWTBearer()), Depends(PresupuestoConsultas(1))])
+def obtener_ventas(
+    cursor: Optional[int] = None,
+    limite: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO),
+    idUsuario: Optional[int] = None,
+    idProducto: Optional[int] = None,
+    despachado: Optional[EstadoDespacho] = None,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    db: Session = Depends(get_db_lectura)
+):
+    query = db.query(*seleccionar_campos(None, COLUMNAS_VENTA, "id"))
+    if idUsuario is not None:
+        query = query.filter(VentaModel.idUsuario == idUsuario)
+    if idProducto is not None:
+        query = query.filter(VentaModel.idProducto == idProducto)
+    if despachado is not None:
+        query = query.filter(VentaModel.despachado == despachado)
+    if desde is not None:
+        query = query.filter(VentaModel.fecha >= desde)
+    if hasta is not None:
+        query = query.filter(VentaModel.fecha < hasta)
+
+    filas, siguiente = paginar(query, VentaModel.id, cursor, limite)
+    return responder_filas(filas, siguiente)
 
 @router.get("/{id}/despachado/{estado}", response_model=List[Venta], dependencies=[Depends(JWTBearer())])
-async def obtener_ventas_filtradas(id: int, estado: EstadoDespacho):
-    return [v for v in ventas if v.id == id and v.despachado == estado]
+def obtener_ventas_filtradas(id: int, estado: EstadoDespacho, db: Session = Depends(get_db_lectura)):
+    query = db.query(*seleccionar_campos(None, COLUMNAS_VENTA, "id"))
+    return responder_filas(query.filter(VentaModel.id == id, VentaModel.despachado == estado).all())
+
+@router.get("/{id}", response_model=Venta, dependencies=[Depends(JWTBearer())])
+def obtener_venta(id: int, db: Session = Depends(get_db_lectura)):
+    venta = db.get(VentaModel, id)
+    if not venta:
+        raise HTTPException(status_code=404, detail="Venta no encontrada")
+    return venta
 
 @router.post("", response_model=Venta, status_code=status.HTTP_201_CREATED, dependencies=[Depends(JWTBearer())])
-async def crear_venta(venta: Venta):
-    if not any(u.id == venta.idUsuario for u in usuarios):
+def crear_venta(venta: VentaCreate, db: Session = Depends(get_db)):
+    if not db.query(Usuario.id).filter(Usuario.id == venta.idUsuario).first():
         raise HTTPException(status_code=400, detail="Usuario no encontrado")
-    if not any(p.id == venta.idProducto for p in productos):
-        raise HTTPException(status_code=400, detail="Producto no encontrado")
-    ventas.append(venta)
-    return venta
+
+    # UPDATE condicional: la fila queda bloqueada hasta el commit y el stock nunca baja de 0,
+    # así dos compras concurrentes del último ítem no pueden pasar las dos.
+    actualizados = (
+        db.query(ProductoModel)
+        .filter(
+            ProductoModel.id == venta.idProducto,
+            ProductoModel.is_active.is_(True),
+            ProductoModel.stock >= venta.cantidad,
+        )
+        .update({ProductoModel.stock: ProductoModel.stock - venta.cantidad}, synchronize_session=False)
+    )
+    if not actualizados:
+        db.rollback()
+        if not db.query(ProductoModel.id).filter(ProductoModel.id == venta.idProducto).first():
+            raise HTTPException(status_code=400, detail="Producto no encontrado")
+        raise HTTPException(status_code=409, detail="Stock insuficiente o producto inactivo")
+
+    precio, categoria = (
+        db.query(ProductoModel.precio, ProductoModel.categoria_producto)
+        .filter(ProductoModel.id == venta.idProducto)
+        .one()
+    )
+    fecha = datetime.utcnow()
+    nueva_venta = VentaModel(
+        **venta.model_dump(),
+        precio_unitario=precio,
+        categoria=categoria,
+        fecha=fecha,
+        despachado=EstadoDespacho.noDespachado,
+    )
+    db.add(nueva_venta)
+    registrar_venta(db, fecha, venta.idProducto, categoria, venta.cantidad, precio)
+    db.commit()
+    db.refresh(nueva_venta)
+    cache_catalogo.invalidar("productos")
+    return nueva_venta
 
 @router.put("/{id}", response_model=Venta, dependencies=[Depends(JWTBearer())])
-async def actualizar_estado_despacho(id: int, estado: EstadoDespacho):
-    for v in ventas:
-        if v.id == id:
-            v.despachado = estado
-            return v
-    raise HTTPException(status_code=404, detail="Venta no encontrada")
+def actualizar_estado_despacho(id: int, estado: EstadoDespacho, db: Session = Depends(get_db)):
+    actualizados = db.query(VentaModel).filter(VentaModel.id == id).update({"despachado": estado}, synchronize_session=False)
+    if not actualizados:
+        raise HTTPException(status_code=404, detail="Venta no encontrada")
+    db.commit()
+    return db.get(VentaModel, id)
@@ -12,5 +12,5 @@ class Categoria(CategoriaBase):
     count_productos: int         
 
     class Config:
-        orm_mode = True
+        from_attributes = True
 
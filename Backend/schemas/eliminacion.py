@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import List, Union
+from enum import Enum
+
+class ModoEliminacion(str, Enum):
+    vacio = "vacio"
+    ids = "ids"
+    pagina = "pagina"
+
+class Eliminados(BaseModel):
+    eliminados: List[Union[int, str]]
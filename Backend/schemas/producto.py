@@ -1,8 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 
-class Producto(BaseModel):
-    id: int = Field(..., gt=0)
+class ProductoBase(BaseModel):
     nombre: str
     descripcion: str
     precio: float
@@ -11,5 +10,21 @@ class Producto(BaseModel):
     is_active: bool
     imagen: Optional[str] = None
 
+class ProductoCreate(ProductoBase):
+    pass
+
+class Producto(ProductoBase):
+    id: int = Field(..., gt=0)
+
     class Config:
-        orm_mode = True
+        from_attributes = True
+
+class ErrorImportacion(BaseModel):
+    linea: int
+    detalle: str
+
+class ResultadoImportacion(BaseModel):
+    insertados: int
+    rechazados: int
+    categorias_creadas: List[str]
+    errores: List[ErrorImportacion]
@@ -6,6 +6,13 @@ class RolUser(str, Enum):
     Cliente = "Cliente"
     Administrador = "Administrador"
 
+def validar_password(v: str) -> str:
+    if len(v) < 8:
+        raise ValueError("La password debe tener al menos 8 caracteres")
+    if sum(c.isupper() for c in v) < 1:
+        raise ValueError("La password debe tener al menos una letra mayúscula")
+    return v
+
 class UsuarioBase(BaseModel):
     nombre: str
     apellido: str
@@ -23,11 +30,23 @@ class UsuarioCreate(UsuarioBase):
 
     @field_validator("password")
     def password_valido(cls, v):
-        if len(v) < 8:
-            raise ValueError("La password debe tener al menos 8 caracteres")
-        if sum(c.isupper() for c in v) < 1:
-            raise ValueError("La password debe tener al menos una letra mayúscula")
-        return v
+        return validar_password(v)
+
+class UsuarioUpdate(BaseModel):
+    nombre: Optional[str] = None
+    apellido: Optional[str] = None
+    email: Optional[EmailStr] = None
+    password: Optional[str] = None
+    pais: Optional[str] = None
+    ciudad: Optional[str] = None
+    direccion: Optional[str] = None
+    telefono: Optional[str] = None
+    rol: Optional[RolUser] = None
+    is_active: Optional[bool] = None
+
+    @field_validator("password")
+    def password_valido(cls, v):
+        return validar_password(v) if v is not None else v
 
 class UsuarioResponse(UsuarioBase):
     id: int
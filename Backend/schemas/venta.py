@@ -7,11 +7,17 @@ class EstadoDespacho(str, Enum):
     despachado = "Despachado"
     noDespachado = "No Despachado"
 
-class Venta(BaseModel):
-    id: int = Field(..., gt=0)
+class VentaBase(BaseModel):
     idUsuario: int = Field(..., gt=0)
     idProducto: int = Field(..., gt=0)
     cantidad: int = Field(..., gt=0)
+
+class VentaCreate(VentaBase):
+    pass
+
+class Venta(VentaBase):
+    id: int = Field(..., gt=0)
+    precio_unitario: Optional[float] = None
     fecha: datetime
     despachado: EstadoDespacho
 
@@ -19,4 +25,7 @@ class Venta(BaseModel):
     def validar_estado(cls, v):
         if v not in EstadoDespacho:
             raise ValueError("El estado debe ser Despachado o No Despachado")
-        return v
\ No newline at end of file
+        return v
+
+    class Config:
+        from_attributes = True
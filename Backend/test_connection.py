@@ -1,14 +1,22 @@
 from sqlalchemy import text
 from db.database import engine
 
-def test_connection():
+def verificar_conexion(engine=engine):
+    """Ejecuta un SELECT 1; devuelve None si anduvo o la excepción si no."""
     try:
         with engine.connect() as connection:
-            result = connection.execute(text("SELECT 1"))
-            print("✅ Conexión a la base de datos exitosa.")
+            connection.execute(text("SELECT 1"))
+        return None
     except Exception as e:
+        return e
+
+def test_connection():
+    error = verificar_conexion()
+    if error is None:
+        print("✅ Conexión a la base de datos exitosa.")
+    else:
         print("❌ Error al conectar con la base de datos:")
-        print(e)
+        print(error)
 
 if __name__ == "__main__":
     test_connection()
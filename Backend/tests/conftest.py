@@ -0,0 +1,52 @@
+import os
+import tempfile
+
+# Valores para que Settings cargue sin .env (no pisan los que ya estén definidos). La base es un
+# SQLite temporal: se define antes de importar la app porque el engine se crea al importarla.
+for clave, valor in {
+    "SECRET_KEY": "tests-secret-key-tests-secret-key",
+    "ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "DB_USER": "tests",
+    "DB_PASSWORD": "tests",
+    "DB_HOST": "localhost",
+    "DB_NAME": "tests",
+    "DB_URL": f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='backend-tests-'), 'tests.db')}",
+    "RATE_LIMIT_ENABLED": "false",
+    "BCRYPT_ROUNDS": "4",
+}.items():
+    os.environ.setdefault(clave, valor)
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+@pytest.fixture
+def db_limpia():
+    """Esquema recreado para cada test, con las FK activas como en InnoDB."""
+    import models.usuario, models.categoria, models.producto, models.venta  # noqa: F401
+    import models.resumen_venta, models.eliminacion  # noqa: F401
+    from core.cache import cache_identidad
+    from db.database import Base, engine
+
+    if engine.dialect.name == "sqlite" and not getattr(engine, "_fks_activas", False):
+        @event.listens_for(engine, "connect")
+        def _activar_fks(conexion, _):
+            conexion.execute("PRAGMA foreign_keys=ON")
+        engine._fks_activas = True
+        engine.dispose()
+
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    cache_identidad._entradas.clear()
+    yield engine
+
+@pytest.fixture
+def cliente(db_limpia):
+    from main import app
+    return TestClient(app)
+
+@pytest.fixture
+def admin():
+    from auth.auth_handler import crear_token
+    return {"Authorization": "Bearer " + crear_token({"email": "admin@tests.com", "rol": "Administrador"})}
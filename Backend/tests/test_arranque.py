@@ -0,0 +1,29 @@
+"""Un precalentamiento fallido no tumba el worker: arranca sin estar listo y reintenta."""
+import time
+from fastapi.testclient import TestClient
+
+import main
+from core import arranque
+
+def test_arranca_sin_estar_listo_y_reintenta(db_limpia, monkeypatch):
+    intentos = []
+
+    def precalentar():
+        intentos.append(1)
+        if len(intentos) == 1:
+            raise ConnectionError("la base todavía no responde")
+        return {}
+
+    monkeypatch.setattr(arranque, "precalentar", precalentar)
+    monkeypatch.setattr(arranque, "ESPERA_INICIAL", 0.3)
+
+    with TestClient(main.app) as cliente:
+        assert cliente.get("/sistema/live").status_code == 200
+        assert cliente.get("/sistema/ready").status_code == 503
+
+        limite = time.monotonic() + 5
+        while cliente.get("/sistema/ready").status_code != 200 and time.monotonic() < limite:
+            time.sleep(0.05)
+        assert cliente.get("/sistema/ready").status_code == 200
+        assert len(intentos) == 2
+    assert not arranque.estado_servidor.listo
@@ -0,0 +1,14 @@
+"""/auth/verify-token valida igual que los endpoints protegidos (denylist y cache de tokens)."""
+from auth.auth_handler import crear_token
+
+def test_verify_token_respeta_el_logout(cliente):
+    sesion = {"Authorization": f"Bearer {crear_token({'email': 'otro@tests.com', 'rol': 'Administrador'})}"}
+    assert cliente.get("/auth/verify-token", headers=sesion).status_code == 200
+
+    # Ya quedó en la cache de tokens: el logout igual tiene que invalidarlo
+    assert cliente.post("/auth/logout", headers=sesion).status_code == 200
+    assert cliente.get("/auth/verify-token", headers=sesion).status_code == 401
+
+def test_verify_token_rechaza_tickets_de_stream(cliente, admin):
+    ticket = cliente.post("/auth/stream-ticket", headers=admin).json()["ticket"]
+    assert cliente.get("/auth/verify-token", headers={"Authorization": f"Bearer {ticket}"}).status_code == 401
@@ -0,0 +1,23 @@
+"""Facetas de /productos/search: cada una se calcula sin su propio filtro, pero con los demás."""
+
+def crear_producto(cliente, admin, nombre: str, precio: float, categoria: str):
+    respuesta = cliente.post("/productos", headers=admin, data={
+        "nombre": nombre, "descripcion": "d", "precio": precio, "stock": 5, "categoria_producto": categoria, "is_active": True,
+    })
+    assert respuesta.status_code == 201
+
+def test_cada_faceta_ignora_solo_su_filtro(cliente, admin):
+    crear_producto(cliente, admin, "auricular barato", 5, "audio")
+    crear_producto(cliente, admin, "auricular caro", 700, "audio")
+    crear_producto(cliente, admin, "auricular gamer", 80, "gaming")
+
+    respuesta = cliente.get("/productos/search?q=auricular&categoria_producto=audio&precio_max=50", headers=admin)
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert cuerpo["total"] == 1
+
+    # Categorías con el filtro de precio (solo el barato) y sin el de categoría
+    assert cuerpo["facetas"]["categorias"] == [{"categoria": "audio", "cantidad": 1}]
+    # Rangos de precio con el filtro de categoría (los dos de audio) y sin el de precio
+    precios = {(p["desde"], p["hasta"]): p["cantidad"] for p in cuerpo["facetas"]["precios"]}
+    assert precios == {(0, 10): 1, (500, 1000): 1}
@@ -0,0 +1,55 @@
+"""Detector de consultas en modo estricto: un endpoint que se pasa del presupuesto no puede responder 200.
+
+Correr desde Backend/ con `python -m pytest tests`.
+"""
+import logging
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from core.config import settings
+from db.detector import DetectorConsultasMiddleware, ExcesoConsultas, PresupuestoConsultas, instrumentar_detector
+
+engine = create_engine("sqlite://")
+instrumentar_detector(engine)
+
+app = FastAPI()
+app.add_middleware(DetectorConsultasMiddleware)
+
+def consultar(veces: int):
+    with engine.connect() as conexion:
+        for _ in range(veces):
+            conexion.execute(text("SELECT 1"))
+
+@app.get("/dentro", dependencies=[Depends(PresupuestoConsultas(2))])
+def dentro_del_presupuesto():
+    consultar(2)
+    return {"ok": True}
+
+@app.get("/excedido", dependencies=[Depends(PresupuestoConsultas(1))])
+def excede_el_presupuesto():
+    consultar(3)
+    return {"ok": True}
+
+@pytest.fixture
+def estricto(monkeypatch):
+    monkeypatch.setattr(settings, "query_detector_strict", True)
+
+def test_dentro_del_presupuesto(estricto):
+    assert TestClient(app).get("/dentro").status_code == 200
+
+def test_exceso_lanza_excepcion(estricto):
+    with pytest.raises(ExcesoConsultas, match=r"emitió 3 consultas \(presupuesto: 1\)"):
+        TestClient(app).get("/excedido")
+
+def test_exceso_no_responde_200(estricto):
+    respuesta = TestClient(app, raise_server_exceptions=False).get("/excedido")
+    assert respuesta.status_code == 500
+    assert "presupuesto: 1" in respuesta.json()["detail"][0]
+
+def test_sin_modo_estricto_solo_registra(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "query_detector_strict", False)
+    with caplog.at_level(logging.ERROR, logger="db.detector"):
+        assert TestClient(app).get("/excedido").status_code == 200
+    assert "presupuesto: 1" in caplog.text
@@ -0,0 +1,58 @@
+"""Productos y usuarios con ventas: la FK de `ventas` impide borrarlos y la API responde 409, no 500."""
+
+USUARIO = dict(
+    nombre="Ana", apellido="Pérez", email="ana@tests.com", password="Secreta123", pais="AR",
+    ciudad="Rosario", direccion="Calle 1", telefono="1", rol="Cliente", is_active=True,
+)
+
+def crear_producto(cliente, admin, nombre: str) -> int:
+    respuesta = cliente.post("/productos", headers=admin, data={
+        "nombre": nombre, "descripcion": "d", "precio": 10, "stock": 5, "categoria_producto": "audio", "is_active": True,
+    })
+    assert respuesta.status_code == 201
+    return respuesta.json()["id"]
+
+def preparar_venta(cliente, admin):
+    vendido = crear_producto(cliente, admin, "vendido")
+    sin_ventas = crear_producto(cliente, admin, "sin ventas")
+    usuario = cliente.post("/usuarios", data=USUARIO).json()["id"]
+    venta = cliente.post("/ventas", headers=admin, json={"idUsuario": usuario, "idProducto": vendido, "cantidad": 1})
+    assert venta.status_code == 201
+    return vendido, sin_ventas, usuario
+
+def test_no_se_borra_un_producto_vendido(cliente, admin):
+    vendido, sin_ventas, _ = preparar_venta(cliente, admin)
+
+    respuesta = cliente.delete(f"/productos/{vendido}", headers=admin)
+    assert respuesta.status_code == 409
+    assert "ventas" in respuesta.json()["detail"]
+    assert cliente.get(f"/productos/{vendido}", headers=admin).status_code == 200
+
+    # El lote es todo o nada: tampoco se borra el que no tiene ventas
+    respuesta = cliente.delete(f"/productos?ids={vendido}&ids={sin_ventas}", headers=admin)
+    assert respuesta.status_code == 409
+    assert cliente.get(f"/productos/{sin_ventas}", headers=admin).status_code == 200
+
+    assert cliente.delete(f"/productos/{sin_ventas}", headers=admin).status_code == 204
+
+def test_no_se_borra_un_usuario_con_compras(cliente, admin):
+    _, _, usuario = preparar_venta(cliente, admin)
+
+    respuesta = cliente.delete(f"/usuarios/{usuario}", headers=admin)
+    assert respuesta.status_code == 409
+    assert cliente.delete(f"/usuarios?ids={usuario}", headers=admin).status_code == 409
+    assert cliente.get(f"/usuarios/{usuario}", headers=admin).status_code == 200
+
+def test_el_rollup_no_impide_borrar_el_producto(cliente, admin, db_limpia):
+    from datetime import date
+    from sqlalchemy import insert
+    from models.resumen_venta import ResumenVentaProducto
+
+    producto = crear_producto(cliente, admin, "con resumen")
+    # Rollup de ventas ya purgadas: queda la fila histórica pero ninguna venta que lo referencie
+    with db_limpia.begin() as conexion:
+        conexion.execute(insert(ResumenVentaProducto).values(
+            fecha=date(2024, 1, 1), idProducto=producto, cantidad=1, ingresos=10, ventas=1,
+        ))
+
+    assert cliente.delete(f"/productos/{producto}", headers=admin).status_code == 204
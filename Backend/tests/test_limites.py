@@ -0,0 +1,30 @@
+"""El límite de registro frena el alta anónima, no al administrador que carga usuarios."""
+import pytest
+
+from core import limites
+from core.config import settings
+
+def usuario(numero: int) -> dict:
+    return dict(
+        nombre="Ana", apellido="Pérez", email=f"ana{numero}@tests.com", password="Secreta123", pais="AR",
+        ciudad="Rosario", direccion="Calle 1", telefono="1", rol="Cliente", is_active=True,
+    )
+
+@pytest.fixture
+def un_registro_por_minuto(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_enabled", True)
+    monkeypatch.setattr(settings, "rate_limits", {"registro": "1/60"})
+    monkeypatch.setattr(limites, "limitador", limites.LimitadorLocal(100))
+
+def test_el_registro_anonimo_se_limita(cliente, un_registro_por_minuto):
+    assert cliente.post("/usuarios", data=usuario(1)).status_code == 201
+    respuesta = cliente.post("/usuarios", data=usuario(2))
+    assert respuesta.status_code == 429
+    assert "Retry-After" in respuesta.headers
+
+def test_el_administrador_no_se_limita(cliente, admin, un_registro_por_minuto):
+    for numero in range(3):
+        assert cliente.post("/usuarios", headers=admin, data=usuario(numero)).status_code == 201
+    # Ni consume el bucket de su IP, ni un token inválido se salta el límite
+    assert cliente.post("/usuarios", headers={"Authorization": "Bearer x"}, data=usuario(3)).status_code == 201
+    assert cliente.post("/usuarios", headers={"Authorization": "Bearer x"}, data=usuario(4)).status_code == 429
@@ -0,0 +1,32 @@
+"""Cache de identidad con claves de texto que la base compara sin distinguir mayúsculas."""
+from sqlalchemy import Column, String, create_engine
+from sqlalchemy.orm import Session, declarative_base
+
+from core.cache import cache_identidad
+from db.lotes import obtener_por_claves, plegar_clave
+
+Base = declarative_base()
+
+class Etiqueta(Base):
+    __tablename__ = "etiquetas"
+    # NOCASE hace de collation *_ci de MySQL
+    nombre = Column(String(collation="NOCASE"), primary_key=True)
+
+def test_claves_con_otras_mayusculas_comparten_la_fila():
+    cache_identidad._entradas.clear()
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(Etiqueta(nombre="Audio"))
+        db.commit()
+
+        query = db.query(Etiqueta.nombre.label("nombre"))
+        encontradas = obtener_por_claves("etiquetas", query, Etiqueta.nombre, ["AUDIO"], normalizar=plegar_clave)
+        assert encontradas == {"AUDIO": {"nombre": "Audio"}}
+
+        # Ya está en cache bajo la clave plegada: no se vuelve a consultar
+        encontradas = obtener_por_claves("etiquetas", None, Etiqueta.nombre, ["audio"], normalizar=plegar_clave)
+        assert encontradas == {"audio": {"nombre": "Audio"}}
+
+def test_plegar_clave_ignora_acentos():
+    assert plegar_clave("Electrónica") == plegar_clave("ELECTRONICA")
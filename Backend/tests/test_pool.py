@@ -0,0 +1,24 @@
+"""Métricas del pool: un pool agotado cuenta como timeout, una base caída como error de conexión."""
+import sqlite3
+import pytest
+from sqlalchemy import create_engine, exc
+
+from db.pool import QueuePoolMedido, estadisticas_pool
+
+def test_pool_agotado_cuenta_timeout():
+    engine = create_engine("sqlite://", poolclass=QueuePoolMedido, pool_size=1, max_overflow=0, pool_timeout=0.01)
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    datos = estadisticas_pool(engine)
+    assert (datos["timeouts"], datos["errores_conexion"]) == (1, 0)
+
+def test_connect_fallido_no_es_timeout():
+    def conectar():
+        raise sqlite3.OperationalError("base caída")
+
+    engine = create_engine("sqlite://", poolclass=QueuePoolMedido, creator=conectar)
+    with pytest.raises(exc.OperationalError):
+        engine.connect()
+    datos = estadisticas_pool(engine)
+    assert (datos["timeouts"], datos["errores_conexion"]) == (0, 1)
@@ -0,0 +1,31 @@
+"""Tickets de stream: abren el SSE por la URL, pero no sirven como token ni al revés."""
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from auth.auth_bearer import JWTBearerSSE
+from auth.auth_handler import crear_token
+
+app = FastAPI()
+
+@app.get("/stream")
+def stream(payload: dict = Depends(JWTBearerSSE())):
+    return payload
+
+def pedir_ticket(cliente, admin) -> str:
+    respuesta = cliente.post("/auth/stream-ticket", headers=admin)
+    assert respuesta.status_code == 200
+    return respuesta.json()["ticket"]
+
+def test_el_ticket_abre_el_stream(cliente, admin):
+    ticket = pedir_ticket(cliente, admin)
+    respuesta = TestClient(app).get(f"/stream?ticket={ticket}")
+    assert respuesta.status_code == 200
+    assert respuesta.json()["email"] == "admin@tests.com"
+
+def test_el_token_de_sesion_no_sirve_como_ticket():
+    token = crear_token({"email": "admin@tests.com", "rol": "Administrador"})
+    assert TestClient(app).get(f"/stream?ticket={token}").status_code == 401
+
+def test_el_ticket_no_sirve_como_token(cliente, admin):
+    ticket = pedir_ticket(cliente, admin)
+    assert cliente.get("/productos", headers={"Authorization": f"Bearer {ticket}"}).status_code == 401
@@ -0,0 +1,40 @@
+"""Un request con imagen que falla no deja temporales en static/ (404 o error de la base)."""
+import io
+import os
+import pytest
+from PIL import Image
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+def png() -> bytes:
+    contenido = io.BytesIO()
+    Image.new("RGB", (4, 4), "red").save(contenido, format="PNG")
+    return contenido.getvalue()
+
+def temporales(carpeta) -> list:
+    return [f for f in os.listdir(carpeta) if f.endswith(".tmp")] if os.path.isdir(carpeta) else []
+
+@pytest.fixture
+def carpeta(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / "static" / "productos"
+
+PRODUCTO = {"nombre": "p", "descripcion": "d", "precio": 10, "stock": 5, "categoria_producto": "audio", "is_active": True}
+
+def test_error_de_la_base_descarta_la_imagen(cliente, admin, carpeta, monkeypatch):
+    def fallar(self, *args, **kwargs):
+        raise OperationalError("INSERT", {}, Exception("conexión perdida"))
+
+    # La categoría nueva se inserta con flush antes de publicar la imagen
+    monkeypatch.setattr(Session, "flush", fallar)
+    cliente_sin_excepciones = type(cliente)(cliente.app, raise_server_exceptions=False)
+    respuesta = cliente_sin_excepciones.post(
+        "/productos", headers=admin, data=PRODUCTO, files={"imagen": ("a.png", png(), "image/png")}
+    )
+    assert respuesta.status_code == 500
+    assert temporales(carpeta) == []
+
+def test_producto_inexistente_descarta_la_imagen(cliente, admin, carpeta):
+    respuesta = cliente.patch("/productos/999", headers=admin, files={"imagen": ("a.png", png(), "image/png")})
+    assert respuesta.status_code == 404
+    assert temporales(carpeta) == []